@@ -0,0 +1,260 @@
+"""Кэш в файле SQLite, общий для всех процессов сервера.
+
+В отличие от LocMemCache копия одна на все воркеры: попадания не делятся
+на число процессов, а сброс версий (posts.cache.bump) сразу виден всем.
+Лишние записи вытесняются по времени последнего чтения (LRU), целые
+числа хранятся как INTEGER, поэтому incr атомарен между процессами.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Время последнего чтения обновляется не чаще раза в секунду,
+# чтобы горячие ключи не превращали каждое чтение в запись.
+TOUCH_INTERVAL = 1.0
+CULL_CHECK_EVERY = 100
+MAX_VARIABLES = 500
+INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+
+
+def _chunks(items):
+    for start in range(0, len(items), MAX_VARIABLES):
+        yield items[start:start + MAX_VARIABLES]
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._location = location
+        self._local = threading.local()
+        self._cull_every = max(
+            1, min(CULL_CHECK_EVERY, self._max_entries // 10)
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._location, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._local.writes = 0
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _encode(self, value):
+        if type(value) is int and value in INT_RANGE:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _fetch(self, keys):
+        connection = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        for chunk in _chunks(keys):
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = self._decode(value)
+                if now - accessed > TOUCH_INTERVAL:
+                    stale.append(key)
+        for chunk in _chunks(stale):
+            connection.execute(
+                'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                [now, *chunk],
+            )
+        return found
+
+    def _store(self, items, timeout):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                [
+                    (key, self._encode(value), expires, now)
+                    for key, value in items
+                ],
+            )
+        self._cull(len(items))
+
+    def _cull(self, written):
+        self._local.writes += written
+        if self._local.writes < self._cull_every:
+            return
+        self._local.writes = 0
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            total, = connection.execute(
+                'SELECT COUNT(*) FROM cache'
+            ).fetchone()
+            if total <= self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                connection.execute('DELETE FROM cache')
+                return
+            excess = (
+                total - self._max_entries
+                + self._max_entries // self._cull_frequency
+            )
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (excess,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        return {
+            made[key]: value
+            for key, value in self._fetch(list(made)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store([(self._key(key, version), value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            self._store(
+                [(self._key(key, version), value)
+                 for key, value in data.items()],
+                timeout,
+            )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now),
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (
+                    key,
+                    self._encode(value),
+                    self.get_backend_timeout(timeout),
+                    now,
+                ),
+            ).rowcount == 1
+        if added:
+            self._cull(1)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] is not None and row[1] <= now:
+                raise ValueError(f"Key '{key}' not found")
+            if isinstance(row[0], int):
+                connection.execute(
+                    'UPDATE cache SET value = value + ? WHERE key = ?',
+                    (delta, key),
+                )
+                value, = connection.execute(
+                    'SELECT value FROM cache WHERE key = ?', (key,)
+                ).fetchone()
+            else:
+                value = self._decode(row[0]) + delta
+                connection.execute(
+                    'UPDATE cache SET value = ? WHERE key = ?',
+                    (self._encode(value), key),
+                )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', (key,)
+        ).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._transaction() as connection:
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'DELETE FROM cache '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                    chunk,
+                )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
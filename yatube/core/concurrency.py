@@ -0,0 +1,141 @@
+"""Чтения во время непрерывной записи для профилей SQLite.
+
+Для каждого профиля из DATABASE_PROFILES создаётся своя база во
+временном каталоге со схемой пользователей, групп, постов и
+комментариев. Писатели в цикле добавляют комментарий так же, как
+add_comment: транзакция сначала читает пост, потом пишет комментарий и
+счётчик. Читатели в это время читают первую страницу главной. Каждый
+поток держит своё соединение, как поток сервера.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from posts.models import Comment, Group, Post, User
+
+ALIAS = 'concurrency_bench'
+MODELS = (User, Group, Post, Comment)
+SEED_USERS = 10
+SEED_POSTS = 1000
+PAGE_SIZE = 10
+
+
+def open_database(profile, path):
+    """Регистрирует базу профиля под ALIAS и создаёт в ней схему."""
+    connections.databases[ALIAS] = {
+        'NAME': path, **settings.DATABASE_PROFILES[profile],
+    }
+    connections.ensure_defaults(ALIAS)
+    connections.prepare_test_settings(ALIAS)
+    with connections[ALIAS].schema_editor() as editor:
+        for model in MODELS:
+            editor.create_model(model)
+    User.objects.using(ALIAS).bulk_create(
+        User(username=f'user{index}') for index in range(SEED_USERS)
+    )
+    users = list(User.objects.using(ALIAS).values_list('id', flat=True))
+    now = timezone.now()
+    Post.objects.using(ALIAS).bulk_create(
+        (
+            Post(text=f'Пост {index}', author_id=users[index % len(users)],
+                 pub_date=now)
+            for index in range(SEED_POSTS)
+        ),
+        batch_size=500,
+    )
+    return users
+
+
+def close_database():
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    del connections.databases[ALIAS]
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, kind, latency, error):
+        with self.lock:
+            if error:
+                self.errors[kind] += 1
+            else:
+                self.latencies[kind].append(latency)
+
+
+def read_page():
+    list(
+        Post.objects.using(ALIAS).select_related('author', 'group')
+        .order_by('-pub_date', '-id')[:PAGE_SIZE]
+    )
+
+
+def write_comment(user_id):
+    with transaction.atomic(using=ALIAS):
+        post_id = Post.objects.using(ALIAS).order_by('-id').values_list(
+            'id', flat=True
+        ).first()
+        # bulk_create: сигналы комментариев работают с базой default.
+        Comment.objects.using(ALIAS).bulk_create([Comment(
+            post_id=post_id, author_id=user_id, text='Комментарий под записью',
+        )])
+        Post.objects.using(ALIAS).filter(pk=post_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+def worker(kind, action, deadline, results):
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                action()
+            except OperationalError:
+                error = True
+            else:
+                error = False
+            results.add(kind, time.perf_counter() - start, error)
+    finally:
+        connections[ALIAS].close()
+
+
+def run_profile(profile, readers, writers, duration):
+    """Гоняет readers читателей и writers писателей duration секунд."""
+    with tempfile.TemporaryDirectory() as directory:
+        users = open_database(profile, os.path.join(directory, 'bench.db'))
+        try:
+            results = Results()
+            deadline = time.monotonic() + duration
+            threads = [
+                threading.Thread(target=worker, args=(
+                    'read', read_page, deadline, results,
+                ))
+                for _ in range(readers)
+            ] + [
+                threading.Thread(target=worker, args=(
+                    'write', partial(write_comment, users[index % len(users)]),
+                    deadline, results,
+                ))
+                for index in range(writers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            close_database()
+    return {
+        'latencies': dict(results.latencies),
+        'errors': dict(results.errors),
+        'duration': duration,
+    }
@@ -0,0 +1,44 @@
+"""Бэкенд SQLite с настройкой соединений для параллельной нагрузки.
+
+Дополнительные ключи OPTIONS:
+pragmas - словарь PRAGMA, которые выполняются на каждом новом
+соединении (journal_mode=WAL, busy_timeout, synchronous и т.д.);
+transaction_mode - режим BEGIN для atomic(). IMMEDIATE берёт блокировку
+записи в начале транзакции: иначе транзакция, которая сначала читает,
+а потом пишет, получает "database is locked" сразу, не дожидаясь
+busy_timeout, потому что SQLite не может повысить её блокировку.
+"""
+from django.db.backends.sqlite3 import base
+
+EXTRA_OPTIONS = ('pragmas', 'transaction_mode')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = dict(options.get('pragmas', {}))
+        self.transaction_mode = options.get('transaction_mode')
+        if self.transaction_mode not in (None, *TRANSACTION_MODES):
+            raise ValueError(
+                f'Неизвестный transaction_mode: {self.transaction_mode!r}'
+            )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in EXTRA_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
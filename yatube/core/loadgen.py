@@ -0,0 +1,293 @@
+"""Генератор нагрузки для оценки числа воркеров.
+
+Сценарии выбираются случайно по весам и выполняются параллельно в
+нескольких потоках, а при необходимости и процессах. Запросы идут
+либо прямо в yatube.wsgi.application внутри процесса, либо по HTTP
+на запущенный сервер. Пользователи входят по настоящей сессии, а
+запись идёт с CSRF-токеном, как из браузера.
+"""
+import io
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+from posts.models import Group, Post, User
+
+DEFAULT_MIX = {'anon': 60, 'feed': 20, 'comment': 15, 'post': 5}
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SAMPLE_SIZE = 1000
+
+
+class WSGITransport:
+    """Вызывает WSGI-приложение напрямую, без сети."""
+
+    def __init__(self):
+        from yatube.wsgi import application
+        self.application = application
+
+    def __call__(self, method, path, body, headers):
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'HTTP_HOST': 'localhost',
+            'wsgi.input': io.BytesIO(body),
+            'CONTENT_LENGTH': str(len(body)),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        }
+        for name, value in headers.items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = response_headers
+
+        chunks = self.application(environ, start_response)
+        try:
+            for _ in chunks:
+                pass
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        cookies = [
+            value for name, value in response['headers']
+            if name.lower() == 'set-cookie'
+        ]
+        return response['status'], cookies
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPTransport:
+    """Ходит на запущенный сервер по HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(NoRedirect)
+
+    def __call__(self, method, path, body, headers):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=body if method == 'POST' else None,
+            headers=headers,
+            method=method,
+        )
+        request.add_header('Content-Type', 'application/x-www-form-urlencoded')
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status, response.headers.get_all(
+                    'Set-Cookie', []
+                )
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get_all('Set-Cookie', [])
+
+
+class Session:
+    """Куки одного виртуального пользователя."""
+
+    def __init__(self, transport, session_key=None):
+        self.transport = transport
+        self.cookies = {}
+        if session_key:
+            self.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    def request(self, method, path, data=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            )
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.cookies.get(
+                settings.CSRF_COOKIE_NAME, ''
+            )
+        body = urlencode(data or {}).encode()
+        status, set_cookies = self.transport(method, path, body, headers)
+        for header in set_cookies:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return status
+
+
+def load_targets():
+    """Выборка адресов для сценариев из текущей базы."""
+    return {
+        'posts': list(
+            Post.objects.order_by('-id').values_list('id', flat=True)[
+                :SAMPLE_SIZE
+            ]
+        ),
+        'groups': list(
+            Group.objects.values_list('slug', flat=True)[:SAMPLE_SIZE]
+        ),
+        'users': list(
+            User.objects.values_list('username', flat=True)[:SAMPLE_SIZE]
+        ),
+    }
+
+
+def login_keys(count):
+    """Ключи сессий для первых count пользователей базы."""
+    keys = []
+    for user in User.objects.order_by('id')[:count]:
+        client = Client()
+        client.force_login(user)
+        keys.append(client.cookies[settings.SESSION_COOKIE_NAME].value)
+    return keys
+
+
+def anonymous_read(session, anonymous, targets, rng):
+    pages = [reverse('posts:index')]
+    if targets['groups']:
+        pages.append(
+            reverse('posts:group_list', args=(rng.choice(targets['groups']),))
+        )
+    if targets['users']:
+        pages.append(
+            reverse('posts:profile', args=(rng.choice(targets['users']),))
+        )
+    if targets['posts']:
+        pages.append(
+            reverse('posts:post_detail', args=(rng.choice(targets['posts']),))
+        )
+    return anonymous.request('GET', rng.choice(pages))
+
+
+def feed_read(session, anonymous, targets, rng):
+    return session.request('GET', reverse('posts:follow_index'))
+
+
+def write_post(session, anonymous, targets, rng):
+    return session.request(
+        'POST', reverse('posts:post_create'), {'text': 'Пост под нагрузкой'}
+    )
+
+
+def write_comment(session, anonymous, targets, rng):
+    if not targets['posts']:
+        return feed_read(session, anonymous, targets, rng)
+    return session.request(
+        'POST',
+        reverse('posts:add_comment', args=(rng.choice(targets['posts']),)),
+        {'text': 'Комментарий под нагрузкой'},
+    )
+
+
+SCENARIOS = {
+    'anon': anonymous_read,
+    'feed': feed_read,
+    'post': write_post,
+    'comment': write_comment,
+}
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = Counter()
+
+    def add(self, scenario, latency, status):
+        with self.lock:
+            self.latencies[scenario].append(latency)
+            self.statuses[status or 'исключение'] += 1
+            if status is None or status >= 400:
+                self.errors[scenario] += 1
+
+
+def worker(transport, session_key, targets, mix, deadline, seed, stats):
+    rng = random.Random(seed)
+    session = Session(transport, session_key)
+    anonymous = Session(transport)
+    session.request('GET', reverse('posts:post_create'))
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.monotonic() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = SCENARIOS[scenario](session, anonymous, targets, rng)
+        except Exception:
+            status = None
+        stats.add(scenario, time.perf_counter() - start, status)
+
+
+def make_transport(url=None):
+    return HTTPTransport(url) if url else WSGITransport()
+
+
+def run(url, mix, threads, duration, seed=0):
+    """Гоняет сценарии в threads потоках duration секунд.
+
+    Без url запросы идут в WSGI-приложение этого процесса.
+    """
+    transport = make_transport(url)
+    targets = load_targets()
+    keys = login_keys(threads)
+    if not keys:
+        raise ValueError('В базе нет пользователей для входа.')
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(threads) as pool:
+        futures = [
+            pool.submit(
+                worker, transport, keys[index % len(keys)], targets, mix,
+                deadline, seed + index, stats,
+            )
+            for index in range(threads)
+        ]
+    for future in futures:
+        future.result()
+    return {
+        'latencies': dict(stats.latencies),
+        'errors': dict(stats.errors),
+        'statuses': dict(stats.statuses),
+    }
+
+
+def merge(results):
+    """Складывает результаты нескольких процессов."""
+    latencies = defaultdict(list)
+    errors = Counter()
+    statuses = Counter()
+    for result in results:
+        for scenario, values in result['latencies'].items():
+            latencies[scenario].extend(values)
+        errors.update(result['errors'])
+        statuses.update(result['statuses'])
+    return {
+        'latencies': dict(latencies),
+        'errors': dict(errors),
+        'statuses': dict(statuses),
+    }
+
+
+def histogram(latencies):
+    """Число запросов в каждом интервале BUCKETS_MS (последний - больше)."""
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for latency in latencies:
+        milliseconds = latency * 1000
+        index = next(
+            (i for i, edge in enumerate(BUCKETS_MS) if milliseconds <= edge),
+            len(BUCKETS_MS),
+        )
+        counts[index] += 1
+    return counts
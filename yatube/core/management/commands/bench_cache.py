@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+from posts.benchmarks import percentile
+
+BACKENDS = (
+    ('LocMemCache', 'django.core.cache.backends.locmem.LocMemCache'),
+    ('SQLiteCache', 'core.cache.sqlite.SQLiteCache'),
+)
+
+
+def run_worker(backend, location, keys, requests, size, seed):
+    """Читает страницы из кэша, при промахе «отрисовывает» и кладёт."""
+    cache = import_string(backend)(location, {
+        'OPTIONS': {'MAX_ENTRIES': keys * 2},
+    })
+    generator = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    payload = os.urandom(size)
+    hits = 0
+    latencies = []
+    for key in generator.choices(range(keys), weights, k=requests):
+        start = time.perf_counter()
+        if cache.get(f'page:{key}') is None:
+            cache.set(f'page:{key}', payload)
+        else:
+            hits += 1
+        latencies.append(time.perf_counter() - start)
+    return hits, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю попаданий и задержку LocMemCache и общего '
+        'SQLiteCache при нескольких процессах-воркерах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--size', type=int, default=4096)
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"бэкенд":<12} {"попадания":>10} {"оп/с":>10} '
+            f'{"p50 мкс":>9} {"p95 мкс":>9} {"p99 мкс":>9}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, backend in BACKENDS:
+                location = os.path.join(directory, f'{name}.sqlite3')
+                jobs = [
+                    (backend, location, options['keys'],
+                     options['requests'], options['size'], seed)
+                    for seed in range(options['workers'])
+                ]
+                start = time.perf_counter()
+                with context.Pool(options['workers']) as pool:
+                    results = pool.starmap(run_worker, jobs)
+                elapsed = time.perf_counter() - start
+                self.report(name, results, elapsed)
+
+    def report(self, name, results, elapsed):
+        hits = sum(worker_hits for worker_hits, _ in results)
+        latencies = sorted(
+            latency for _, worker in results for latency in worker
+        )
+        p50, p95, p99 = (
+            percentile(latencies, share) * 1e6 for share in (0.5, 0.95, 0.99)
+        )
+        self.stdout.write(
+            f'{name:<12} {hits / len(latencies):>10.1%} '
+            f'{len(latencies) / elapsed:>10.0f} '
+            f'{p50:>9.1f} {p95:>9.1f} {p99:>9.1f}'
+        )
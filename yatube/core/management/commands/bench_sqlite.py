@@ -0,0 +1,53 @@
+from core import concurrency
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from posts.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает профили SQLite из DATABASE_PROFILES: сколько чтений '
+        'в секунду проходит, пока другие потоки непрерывно пишут, и '
+        'сколько операций падает с "database is locked". Каждый профиль '
+        'работает со своей временной базой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', default=list(settings.DATABASE_PROFILES),
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        unknown = set(options['profiles']) - settings.DATABASE_PROFILES.keys()
+        if unknown:
+            raise CommandError(f'Неизвестные профили: {sorted(unknown)}')
+        self.stdout.write(
+            f'{"профиль":<12} {"операция":<8} {"в секунду":>10} '
+            f'{"ошибок":>7} {"p50 мс":>8} {"p95 мс":>8} {"p99 мс":>8}'
+        )
+        for profile in options['profiles']:
+            result = concurrency.run_profile(
+                profile, options['readers'], options['writers'],
+                options['duration'],
+            )
+            for kind in ('read', 'write'):
+                self.write_row(profile, kind, result)
+
+    def write_row(self, profile, kind, result):
+        values = sorted(result['latencies'].get(kind, []))
+        errors = result['errors'].get(kind, 0)
+        if values:
+            p50, p95, p99 = (
+                f'{percentile(values, share) * 1000:>8.1f}'
+                for share in (0.5, 0.95, 0.99)
+            )
+        else:
+            p50 = p95 = p99 = f'{"-":>8}'
+        self.stdout.write(
+            f'{profile:<12} {kind:<8} '
+            f'{len(values) / result["duration"]:>10.1f} {errors:>7} '
+            f'{p50} {p95} {p99}'
+        )
@@ -0,0 +1,78 @@
+import time
+
+from core.warmup import reset_templates, warm_templates
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from posts.benchmarks import percentile
+from posts.models import Group, Post, User
+
+TEMPLATE = 'posts/index.html'
+
+
+def sample_context(count):
+    """Контекст главной с постами в памяти, без обращений к БД."""
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    group = Group(id=1, title='Группа', slug='group')
+    posts = [
+        Post(
+            id=index,
+            text=f'Текст поста номер {index} ' * 10,
+            pub_date=timezone.now(),
+            author=User(id=index, username=f'author{index}'),
+            group=group,
+        )
+        for index in range(1, count + 1)
+    ]
+    return request, {'page_obj': Paginator(posts, count).page(1)}
+
+
+class Command(BaseCommand):
+    help = (
+        f'Сравнивает время отрисовки {TEMPLATE} с холодным и прогретым '
+        'кэшем шаблонов. Кэш фрагментов на время замера отключён.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=10)
+
+    def handle(self, *args, **options):
+        request, context = sample_context(options['posts'])
+        dummy = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }}
+        with override_settings(CACHES=dummy):
+            cold = self.measure(request, context, options['iterations'], True)
+            start = time.perf_counter()
+            warmed = warm_templates()
+            warmup = time.perf_counter() - start
+            warm = self.measure(request, context, options['iterations'], False)
+        self.stdout.write(
+            f'Прогрев: {warmed} шаблонов за {warmup * 1000:.1f} мс'
+        )
+        self.report('холодный', cold)
+        self.report('прогретый', warm)
+        speedup = percentile(cold, 0.5) / percentile(warm, 0.5)
+        self.stdout.write(f'Ускорение по медиане: {speedup:.1f}x')
+
+    @staticmethod
+    def measure(request, context, iterations, cold):
+        timings = []
+        for _ in range(iterations):
+            if cold:
+                reset_templates()
+            start = time.perf_counter()
+            render_to_string(TEMPLATE, context, request)
+            timings.append(time.perf_counter() - start)
+        return sorted(timings)
+
+    def report(self, name, timings):
+        p50, p95 = (percentile(timings, share) * 1000 for share in (0.5, 0.95))
+        self.stdout.write(
+            f'{name:<10} p50 {p50:7.2f} мс  p95 {p95:7.2f} мс'
+        )
@@ -0,0 +1,110 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from core import loadgen
+from django.core.management.base import BaseCommand, CommandError
+from posts.benchmarks import percentile
+
+BAR_WIDTH = 40
+
+
+def parse_mix(value):
+    """Разбирает смесь вида anon=60,feed=20,comment=15,post=5."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in loadgen.SCENARIOS or not weight.isdigit():
+            raise CommandError(f'Неверная доля сценария: {part!r}')
+        mix[name] = int(weight)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает сайт смесью чтений и записей в нескольких потоках '
+        'и процессах и печатает пропускную способность, гистограмму '
+        'задержек и долю ошибок. Пишет посты и комментарии в базу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', help='Адрес сервера; без него - WSGI в процессе.',
+        )
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument(
+            '--mix', type=parse_mix,
+            default=dict(loadgen.DEFAULT_MIX),
+            help='Веса сценариев anon, feed, comment, post.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        jobs = [
+            (options['url'], options['mix'], options['threads'],
+             options['duration'], options['seed'] + index * 1000)
+            for index in range(options['processes'])
+        ]
+        start = time.perf_counter()
+        try:
+            if options['processes'] == 1:
+                results = [loadgen.run(*jobs[0])]
+            else:
+                results = self.run_processes(jobs)
+        except ValueError as error:
+            raise CommandError(error)
+        self.report(loadgen.merge(results), time.perf_counter() - start)
+
+    @staticmethod
+    def run_processes(jobs):
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            len(jobs), mp_context=context, initializer=django.setup,
+        ) as pool:
+            futures = [pool.submit(loadgen.run, *job) for job in jobs]
+            return [future.result() for future in futures]
+
+    def report(self, result, elapsed):
+        latencies = result['latencies']
+        everything = sorted(v for values in latencies.values() for v in values)
+        if not everything:
+            raise CommandError('Не выполнено ни одного запроса.')
+        errors = sum(result['errors'].values())
+        self.stdout.write(
+            f'Запросов: {len(everything)} за {elapsed:.1f} с, '
+            f'{len(everything) / elapsed:.1f} запросов/с, '
+            f'ошибок {errors / len(everything):.2%}'
+        )
+        self.stdout.write(
+            f'{"сценарий":<10} {"запросов":>9} {"ошибок":>8} '
+            f'{"p50 мс":>8} {"p95 мс":>8} {"p99 мс":>8}'
+        )
+        for scenario, values in sorted(latencies.items()):
+            values = sorted(values)
+            p50, p95, p99 = (
+                percentile(values, share) * 1000 for share in (0.5, 0.95, 0.99)
+            )
+            self.stdout.write(
+                f'{scenario:<10} {len(values):>9} '
+                f'{result["errors"].get(scenario, 0):>8} '
+                f'{p50:>8.1f} {p95:>8.1f} {p99:>8.1f}'
+            )
+        self.stdout.write('Ответы: ' + ', '.join(
+            f'{status}: {count}'
+            for status, count in sorted(
+                result['statuses'].items(), key=lambda item: str(item[0])
+            )
+        ))
+        self.write_histogram(everything)
+
+    def write_histogram(self, latencies):
+        counts = loadgen.histogram(latencies)
+        peak = max(counts)
+        edges = [f'≤{edge} мс' for edge in loadgen.BUCKETS_MS]
+        edges.append(f'>{loadgen.BUCKETS_MS[-1]} мс')
+        for edge, count in zip(edges, counts):
+            bar = '#' * round(BAR_WIDTH * count / peak)
+            self.stdout.write(f'{edge:>10} {count:>8} {bar}')
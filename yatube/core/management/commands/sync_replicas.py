@@ -0,0 +1,34 @@
+import time
+
+from core import replicas
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу в реплики REPLICA_DATABASES через backup '
+        'API SQLite каждые REPLICA_SYNC_INTERVAL секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true', help='Скопировать один раз.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=settings.REPLICA_SYNC_INTERVAL,
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('Реплики не настроены: задайте DB_REPLICAS.')
+        while True:
+            started = time.monotonic()
+            for alias in settings.REPLICA_DATABASES:
+                seconds = replicas.sync(alias)
+                self.stdout.write(f'{alias}: скопирована за {seconds:.2f} с')
+            if options['once']:
+                return
+            time.sleep(max(0, options['interval'] - (
+                time.monotonic() - started
+            )))
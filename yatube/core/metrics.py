@@ -0,0 +1,203 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+MetricsMiddleware замеряет каждый запрос: время ответа, число и время
+запросов к БД (через execute_wrapper, без DEBUG), попадания в кэш и
+размер ответа. Пока запрос идёт, всё копится в его собственном
+объекте без блокировок; в общий реестр результат попадает один раз
+в конце, под коротким локом. Метрики группируются по имени URL.
+Реестр живёт в памяти процесса: при нескольких воркерах каждый
+отдаёт свои числа, а складывает их уже Prometheus.
+"""
+import bisect
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.db import connections
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNMATCHED = '<unmatched>'
+PREFIX = 'yatube'
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; он же обёртка запросов к БД."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.cache = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.bytes = 0
+        self.statuses = Counter()
+        self.cache = Counter()
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewMetrics)
+
+    def observe(self, view, status, seconds, size, current):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            metrics = self.views[view]
+            metrics.buckets[index] += 1
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.queries += current.queries
+            metrics.query_seconds += current.query_seconds
+            metrics.bytes += size
+            metrics.statuses[status] += 1
+            metrics.cache.update(current.cache)
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self):
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+            for name, help_text, kind, render in METRICS:
+                lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+                lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+                for view, metrics in views:
+                    lines.extend(
+                        f'{PREFIX}_{name}{suffix}'
+                        f'{_labels(view=view, **labels)} {_number(value)}'
+                        for suffix, labels, value in render(metrics)
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+def _duration(metrics):
+    total = 0
+    for edge, count in zip(BUCKETS, metrics.buckets):
+        total += count
+        yield '_bucket', {'le': _number(edge)}, total
+    yield '_bucket', {'le': '+Inf'}, metrics.count
+    yield '_sum', {}, metrics.seconds
+    yield '_count', {}, metrics.count
+
+
+METRICS = (
+    (
+        'request_duration_seconds', 'Время ответа.', 'histogram', _duration,
+    ),
+    (
+        'requests_total', 'Ответы по статусам.', 'counter',
+        lambda metrics: (
+            ('', {'status': status}, count)
+            for status, count in sorted(metrics.statuses.items())
+        ),
+    ),
+    (
+        'db_queries_total', 'Запросы к БД.', 'counter',
+        lambda metrics: (('', {}, metrics.queries),),
+    ),
+    (
+        'db_query_seconds_total', 'Время запросов к БД.', 'counter',
+        lambda metrics: (('', {}, metrics.query_seconds),),
+    ),
+    (
+        'response_bytes_total', 'Размер тел ответов.', 'counter',
+        lambda metrics: (('', {}, metrics.bytes),),
+    ),
+    (
+        'cache_requests_total', 'Обращения к кэшу страниц и фрагментов.',
+        'counter',
+        lambda metrics: (
+            ('', {'cache': cache, 'result': result}, count)
+            for (cache, result), count in sorted(metrics.cache.items())
+        ),
+    ),
+)
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _labels(**labels):
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    ) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+registry = Registry()
+
+
+def count_cache(cache, hits, misses):
+    """Учитывает обращения к кэшу в метриках текущего запроса."""
+    current = getattr(_local, 'current', None)
+    if current is None:
+        return
+    if hits:
+        current.cache[cache, 'hit'] += hits
+    if misses:
+        current.cache[cache, 'miss'] += misses
+
+
+def _page_cache(request, current):
+    # cache_page помечает запрос: False - ответ взят из кэша.
+    update = getattr(request, '_cache_update_cache', None)
+    if update is None or request.method not in ('GET', 'HEAD'):
+        return
+    current.cache['page', 'miss' if update else 'hit'] += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current = RequestMetrics()
+        _local.current = current
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(current))
+                response = self.get_response(request)
+        finally:
+            _local.current = None
+        seconds = time.perf_counter() - start
+        _page_cache(request, current)
+        match = request.resolver_match
+        registry.observe(
+            match.view_name if match else UNMATCHED,
+            response.status_code,
+            seconds,
+            0 if response.streaming else len(response.content),
+            current,
+        )
+        return response
@@ -0,0 +1,154 @@
+"""Чтение страниц ленты с реплик базы.
+
+Реплики - копии основной базы SQLite, которые команда sync_replicas
+обновляет через backup API. После каждой копии в кэш пишется время,
+на которое реплика совпадает с основной базой; отсюда отставание.
+ReplicaMiddleware на GET-запросы к REPLICA_VIEWS выбирает реплику,
+отставание которой не больше REPLICA_MAX_LAG, и ReplicaRouter
+отправляет на неё чтения. page_validators вдобавок сверяет копию с
+last_changed страницы, чтобы в кэш не попадали устаревшие страницы.
+Запись всегда идёт в default. После любого запроса с записью клиент
+получает куку и REPLICA_PIN_SECONDS читает только из основной базы -
+так он видит свои изменения.
+"""
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'replica_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+def _synced_key(alias):
+    return f'replica:synced:{alias}'
+
+
+def record_sync(alias, stamp):
+    cache.set(_synced_key(alias), stamp, None)
+
+
+def synced_at(aliases=None):
+    """Время последней копии реплик; None - реплика ни разу не копировалась."""
+    if aliases is None:
+        aliases = settings.REPLICA_DATABASES
+    found = cache.get_many([_synced_key(alias) for alias in aliases])
+    return {alias: found.get(_synced_key(alias)) for alias in aliases}
+
+
+def lags(aliases=None):
+    """Отставание реплик от основной базы в секундах."""
+    now = time.time()
+    return {
+        alias: None if stamp is None else now - stamp
+        for alias, stamp in synced_at(aliases).items()
+    }
+
+
+def use_replica():
+    """Выбирает для чтений текущего потока реплику с допустимым отставанием."""
+    oldest = time.time() - settings.REPLICA_MAX_LAG
+    usable = {
+        alias: stamp for alias, stamp in synced_at().items()
+        if stamp is not None and stamp >= oldest
+    }
+    if usable:
+        _state.replica = random.choice(list(usable))
+        _state.synced = usable[_state.replica]
+
+
+def current():
+    return getattr(_state, 'replica', None)
+
+
+def ensure_fresh(changed):
+    """Возвращает чтения в основную базу, если реплика старше changed.
+
+    Иначе страница, собранная из старых данных, попала бы в кэш под
+    новой версией и жила бы там до следующего изменения.
+    """
+    if current() and _state.synced < changed:
+        _state.replica = None
+
+
+def backup(source_path, target_path):
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def sync(alias):
+    """Копирует основную базу в реплику и запоминает момент копии."""
+    stamp = time.time()
+    backup(
+        connections[DEFAULT_DB_ALIAS].settings_dict['NAME'],
+        connections[alias].settings_dict['NAME'],
+    )
+    record_sync(alias, stamp)
+    return time.time() - stamp
+
+
+def render_lag():
+    """Отставание реплик для /metrics."""
+    if not settings.REPLICA_DATABASES:
+        return ''
+    lines = [
+        '# HELP yatube_replica_lag_seconds Отставание реплики от основной.',
+        '# TYPE yatube_replica_lag_seconds gauge',
+    ]
+    lines.extend(
+        f'yatube_replica_lag_seconds{{database="{alias}"}} '
+        f'{"NaN" if lag is None else repr(lag)}'
+        for alias, lag in sorted(lags().items())
+    )
+    return '\n'.join(lines) + '\n'
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.replica = None
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.REPLICA_DATABASES
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+        ):
+            use_replica()
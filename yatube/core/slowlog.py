@@ -0,0 +1,140 @@
+"""Журнал медленных запросов к БД.
+
+SlowQueryMiddleware вешает на соединения execute_wrapper, который
+замеряет каждый запрос. Запросы дольше SLOW_QUERY_MS миллисекунд
+пишутся в логгер core.slowlog одной JSON-строкой: текст и параметры,
+время, имя вьюхи, сокращённый стек вызовов из кода проекта и план
+SQLite EXPLAIN QUERY PLAN для SELECT. Параметры запросов (сессии, хеши
+паролей) пишутся только при SLOW_QUERY_LOG_PARAMS. Куда и с какой
+ротацией писать, задаёт LOGGING в настройках.
+"""
+import json
+import logging
+import os
+import time
+import traceback
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 8
+PARAM_LENGTH = 200
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class JSONFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON с полями из extra={'entry': ...}."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'entry', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def stack_summary():
+    """Последние кадры стека из кода проекта, без библиотек."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(PROJECT_DIR)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, PROJECT_DIR)}:{frame.lineno}'
+        f' {frame.name}'
+        for frame in frames[-STACK_DEPTH:]
+    ]
+
+
+def _param(value):
+    text = repr(value)
+    if len(text) > PARAM_LENGTH:
+        return text[:PARAM_LENGTH] + '...'
+    return text
+
+
+class SlowQueryLogger:
+    def __init__(self, connection, threshold, request=None):
+        self.connection = connection
+        self.threshold = threshold
+        self.request = request
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration >= self.threshold:
+                self.log(sql, params, many, duration)
+
+    def view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    def explain(self, sql, params, many):
+        if self.connection.vendor != 'sqlite' or many or not (
+            sql.lstrip()[:6].upper() == 'SELECT'
+        ):
+            return None
+        self.explaining = True
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [row[-1] for row in cursor.fetchall()]
+        except Exception as error:
+            return [f'не удалось получить план: {error}']
+        finally:
+            self.explaining = False
+
+    def log(self, sql, params, many, duration):
+        if many or not settings.SLOW_QUERY_LOG_PARAMS:
+            logged_params = None
+        else:
+            logged_params = [_param(param) for param in params or ()]
+        logger.warning('Медленный запрос: %.1f мс', duration, extra={'entry': {
+            'duration_ms': round(duration, 3),
+            'database': self.connection.alias,
+            'view': self.view_name(),
+            'path': getattr(self.request, 'path', None),
+            'sql': sql,
+            'params': logged_params,
+            'many': many,
+            'stack': stack_summary(),
+            'plan': self.explain(sql, params, many),
+        }})
+
+
+def log_slow_queries(request=None, threshold=None):
+    """Контекст, в котором медленные запросы всех БД попадают в журнал."""
+    if threshold is None:
+        threshold = settings.SLOW_QUERY_MS
+    stack = ExitStack()
+    if threshold is not None:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(
+                SlowQueryLogger(connection, threshold, request)
+            ))
+    return stack
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with log_slow_queries(request):
+            return self.get_response(request)
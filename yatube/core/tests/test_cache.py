@@ -0,0 +1,67 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from core.cache.sqlite import SQLiteCache
+from django.test import SimpleTestCase
+
+
+def incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2},
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_and_expiry(self):
+        self.cache.set('page', {'html': '<p>пост</p>'})
+        self.cache.set('short', 'значение', timeout=0.05)
+        self.assertEqual(self.cache.get('page'), {'html': '<p>пост</p>'})
+        self.assertEqual(self.cache.get_many(['page', 'missing']), {
+            'page': {'html': '<p>пост</p>'},
+        })
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 'новое'))
+        self.assertFalse(self.cache.add('short', 'другое'))
+        self.assertEqual(self.cache.get('short'), 'новое')
+
+    def test_incr_is_shared_between_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=incr_many, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_are_evicted(self):
+        self.cache.set('hot', 'горячий')
+        for index in range(30):
+            self.cache._connection().execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                (time.time() + 60, self.cache.make_key('hot')),
+            )
+            self.cache.set(f'cold{index}', index)
+        count, = self.cache._connection().execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()
+        self.assertLessEqual(count, 10)
+        self.assertEqual(self.cache.get('hot'), 'горячий')
@@ -0,0 +1,15 @@
+from core import concurrency
+from django.db import connections
+from django.test import SimpleTestCase
+
+
+class ConcurrencyBenchTests(SimpleTestCase):
+    def test_production_profile_writes_without_locks(self):
+        """Запись под production не падает с database is locked."""
+        result = concurrency.run_profile(
+            'production', readers=2, writers=2, duration=0.3
+        )
+        self.assertTrue(result['latencies']['read'])
+        self.assertTrue(result['latencies']['write'])
+        self.assertEqual(result['errors'], {})
+        self.assertNotIn(concurrency.ALIAS, connections.databases)
@@ -0,0 +1,44 @@
+from core import loadgen
+from core.management.commands.loadtest import parse_mix
+from django.core.management import CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase
+from posts.models import Comment, Post, User
+
+
+class LoadGeneratorTest(TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('anon=3,post=1'), {'anon': 3, 'post': 1})
+        with self.assertRaises(CommandError):
+            parse_mix('anon=3,delete=1')
+
+    def test_histogram(self):
+        counts = loadgen.histogram([0.0005, 0.003, 0.003, 10])
+        self.assertEqual(counts[0], 1)
+        self.assertEqual(counts[2], 2)
+        self.assertEqual(counts[-1], 1)
+        self.assertEqual(sum(counts), 4)
+
+    def test_session_writes_through_wsgi_with_csrf(self):
+        # Как и тестовый клиент, не даём WSGI закрыть соединение теста.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        user = User.objects.create_user(username='loader')
+        post = Post.objects.create(author=user, text='Пост')
+        transport = loadgen.WSGITransport()
+        session = loadgen.Session(transport, loadgen.login_keys(1)[0])
+        self.assertEqual(session.request('GET', '/create/'), 200)
+        targets = loadgen.load_targets()
+        status = loadgen.write_comment(session, None, targets, _First())
+        self.assertEqual(status, 302)
+        self.assertTrue(Comment.objects.filter(post=post).exists())
+        anonymous = loadgen.Session(transport)
+        self.assertEqual(anonymous.request('POST', '/create/'), 403)
+
+
+class _First:
+    @staticmethod
+    def choice(values):
+        return values[0]
@@ -0,0 +1,72 @@
+from core.metrics import registry
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+
+TOKEN = 'metrics-token'
+
+
+@override_settings(METRICS_TOKEN=TOKEN)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+        registry.reset()
+
+    def test_metrics_collects_views(self):
+        """Вьюхи попадают в метрики со временем, БД и кэшем."""
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get('/unexisting_page/')
+        response = self.guest_client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION=f'Bearer {TOKEN}'
+        )
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        view = 'view="posts:index"'
+        cache_lines = {
+            ('page', 'hit'): 1,
+            ('page', 'miss'): 1,
+            ('article', 'miss'): 1,
+        }
+        lines = [
+            f'yatube_request_duration_seconds_bucket{{{view},le="+Inf"}} 2',
+            f'yatube_request_duration_seconds_count{{{view}}} 2',
+            f'yatube_requests_total{{{view},status="200"}} 2',
+            'yatube_requests_total{view="<unmatched>",status="404"} 1',
+        ] + [
+            f'yatube_cache_requests_total{{{view},cache="{name}",'
+            f'result="{result}"}} {count}'
+            for (name, result), count in cache_lines.items()
+        ]
+        for line in lines:
+            with self.subTest(line=line):
+                self.assertIn(line + '\n', text)
+        self.assertRegex(
+            text, r'yatube_db_queries_total\{view="posts:index"\} [1-9]'
+        )
+
+    def test_metrics_need_token_or_staff(self):
+        """Запрос с 127.0.0.1 без токена - не повод открыть метрики."""
+        url = reverse('metrics')
+        for token in ('', 'Bearer wrong'):
+            with self.subTest(token=token):
+                response = self.guest_client.get(
+                    url, REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION=token
+                )
+                self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            response = self.guest_client.get(
+                url, HTTP_AUTHORIZATION='Bearer '
+            )
+            self.assertEqual(response.status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.guest_client.force_login(self.user)
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
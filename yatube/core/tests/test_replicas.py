@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from core import replicas
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.cache import bump
+from posts.models import Post, User
+
+REPLICA = 'replica1'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        # Реплика - второе соединение с той же тестовой базой.
+        connections.databases[REPLICA] = dict(
+            connections['default'].settings_dict
+        )
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(text='Тестовый пост', author=self.user)
+        self.client = Client()
+
+    def tearDown(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def replica_queries(self, url):
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_feed_reads_go_to_synced_replica(self):
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        self.assertEqual(self.replica_queries(url), 0)
+        replicas.record_sync(REPLICA, time.time())
+        self.assertGreater(self.replica_queries(url), 0)
+        self.assertEqual(self.replica_queries(reverse('about:author')), 0)
+
+    def test_lagging_or_older_replica_is_skipped(self):
+        replicas.record_sync(REPLICA, time.time() - 3600)
+        self.assertEqual(self.replica_queries(reverse('posts:index')), 0)
+        replicas.record_sync(REPLICA, time.time())
+        bump('page:index')
+        self.assertEqual(self.replica_queries(reverse('posts:index')), 0)
+
+    def test_client_reads_primary_after_write(self):
+        replicas.record_sync(REPLICA, time.time())
+        self.client.force_login(self.user)
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый'})
+        replicas.record_sync(REPLICA, time.time())
+        self.assertEqual(self.replica_queries(
+            reverse('posts:profile', args=(self.user.username,))
+        ), 0)
+
+
+class BackupTests(TransactionTestCase):
+    def test_backup_copies_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'source.db')
+            target = os.path.join(directory, 'target.db')
+            with sqlite3.connect(source) as connection:
+                connection.execute('CREATE TABLE t (x)')
+                connection.execute('INSERT INTO t VALUES (1)')
+            replicas.backup(source, target)
+            with sqlite3.connect(target) as connection:
+                rows = connection.execute('SELECT x FROM t').fetchall()
+        self.assertEqual(rows, [(1,)])
@@ -0,0 +1,56 @@
+import json
+
+from core.slowlog import JSONFormatter
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_queries_logged_with_view_and_plan(self):
+        """Запросы выше порога пишутся с вьюхой, стеком и планом."""
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            self.guest_client.get(reverse('posts:index'))
+        entries = [record.entry for record in logs.records]
+        selects = [
+            entry for entry in entries if entry['sql'].startswith('SELECT')
+        ]
+        self.assertTrue(selects)
+        entry = selects[0]
+        self.assertEqual(entry['view'], 'posts:index')
+        self.assertTrue(entry['plan'])
+        self.assertTrue(
+            any(frame.startswith('posts/') for frame in entry['stack'])
+        )
+        line = json.loads(JSONFormatter().format(logs.records[0]))
+        self.assertEqual(line['sql'], entries[0]['sql'])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_params_hidden_unless_enabled(self):
+        post_id = Post.objects.get().id
+        url = reverse('posts:post_detail', args=(post_id,))
+        for enabled in (False, True):
+            with self.subTest(enabled=enabled):
+                cache.clear()
+                with override_settings(SLOW_QUERY_LOG_PARAMS=enabled):
+                    with self.assertLogs('core.slowlog', 'WARNING') as logs:
+                        self.guest_client.get(url)
+                params = [record.entry['params'] for record in logs.records]
+                self.assertEqual(any(params), enabled, params)
+
+    @override_settings(SLOW_QUERY_MS=None)
+    def test_disabled_log_writes_nothing(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.slowlog', 'WARNING'):
+                self.guest_client.get(reverse('posts:index'))
@@ -0,0 +1,21 @@
+import io
+
+from core.warmup import reset_templates, warm_templates
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase
+
+
+class TemplateWarmupTest(SimpleTestCase):
+    def test_warmup_fills_cached_loader(self):
+        loader = engines['django'].engine.template_loaders[0]
+        reset_templates()
+        self.assertFalse(loader.get_template_cache)
+        compiled = warm_templates()
+        self.assertIn('posts/includes/article.html', loader.get_template_cache)
+        self.assertEqual(len(loader.get_template_cache), compiled)
+
+    def test_bench_templates_command(self):
+        output = io.StringIO()
+        call_command('bench_templates', '--iterations', '2', stdout=output)
+        self.assertIn('Ускорение', output.getvalue())
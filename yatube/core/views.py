@@ -1,4 +1,11 @@
+from core import replicas
+from core.metrics import registry
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
 
 
 def page_not_found(request, exception):
@@ -14,4 +21,26 @@ def internal_server_error(request):
 
 
 def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
+    return render(request, 'core/403csrf.html', status=403)
+
+
+def _has_metrics_token(request):
+    return bool(settings.METRICS_TOKEN) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    )
+
+
+@never_cache
+def metrics(request):
+    """Метрики процесса для Prometheus: по METRICS_TOKEN или персоналу.
+
+    Адрес клиента не проверяется: за обратным прокси все запросы
+    приходят с 127.0.0.1.
+    """
+    if not (request.user.is_staff or _has_metrics_token(request)):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render() + replicas.render_lag(),
+        content_type='text/plain; version=0.0.4',
+    )
@@ -0,0 +1,49 @@
+"""Прогрев кэша шаблонов при старте процесса.
+
+С cached.Loader шаблон разбирается при первом обращении, и эту цену
+платит первый запрос каждой страницы в каждом воркере. warm_templates()
+заранее компилирует все шаблоны проекта и приложений.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Имена всех шаблонов из DIRS и каталогов templates приложений."""
+    dirs = list(engine.dirs) + list(get_app_template_dirs('templates'))
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(('.html', '.txt')):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Компилирует все шаблоны в кэш загрузчика, возвращает их число.
+
+    Шаблон с ошибкой не мешает старту: он попадёт в лог, а сама ошибка
+    повторится при отрисовке, как и без прогрева.
+    """
+    engine = engines['django'].engine
+    compiled = 0
+    for name in set(template_names(engine)):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.warning('Шаблон %s не скомпилирован', name, exc_info=True)
+        else:
+            compiled += 1
+    return compiled
+
+
+def reset_templates():
+    """Сбрасывает кэш разобранных шаблонов."""
+    for loader in engines['django'].engine.template_loaders:
+        if hasattr(loader, 'reset'):
+            loader.reset()
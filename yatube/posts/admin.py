@@ -1,4 +1,6 @@
 from django.contrib import admin
+from posts import search
+from posts.utils import EstimatedCountPaginator
 
 from .models import Group, Post
 
@@ -12,9 +14,31 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Список групп выбирается один раз на запрос, а не на строку."""
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                choices = list(iter(formfield.choices))
+                request._group_choices = choices
+            formfield.choices = choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.matching(queryset, search_term), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,115 @@
+"""Перенос старых постов в архив.
+
+Почти весь трафик приходится на свежие посты, поэтому posts_post и
+posts_comment держат только их, а посты старше POST_ARCHIVE_AFTER_DAYS
+дней вместе с комментариями команда archive_posts порциями переносит в
+ArchivedPost и ArchivedComment. id при переносе сохраняются: post_detail
+находит пост в архиве по тому же адресу, а курсор списка, дойдя до
+конца горячей таблицы, продолжает листать архив (KeysetPaginator).
+
+Порция сначала копируется в архив, потом удаляется из горячей базы.
+Если процесс упал между шагами, следующий запуск заменит оставшуюся
+в архиве копию свежей и доделает удаление. Удаление идёт мимо сигналов:
+пост не пропал, а переехал, и счётчики автора и комментариев остаются
+прежними. Записи ленты подписок удаляются: лента дочитывает архив по
+подпискам. Из поиска архивные посты уходят; посты, картинка которых
+ещё обрабатывается, ждут следующего запуска.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from posts import cache, sharding
+from posts.models import (ArchivedComment, ArchivedPost, Comment, FeedEntry,
+                          ImageJob, Post)
+
+BATCH_SIZE = 500
+
+
+def cutoff(days=None):
+    """Граница архива: посты, опубликованные раньше, переносятся."""
+    if days is None:
+        days = settings.POST_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def _copy(posts, comments):
+    ArchivedPost.objects.bulk_create(
+        [
+            ArchivedPost(
+                id=post.id,
+                text=post.text,
+                pub_date=post.pub_date,
+                author_id=post.author_id,
+                group_id=post.group_id,
+                image=post.image.name,
+                comments_count=post.comments_count,
+            )
+            for post in posts
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    ArchivedComment.objects.bulk_create(
+        (
+            ArchivedComment(
+                source_id=comment.id,
+                post_id=comment.post_id,
+                author_id=comment.author_id,
+                text=comment.text,
+                created=comment.created,
+            )
+            for comment in comments.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def archive_batch(using, before, batch_size):
+    """Переносит до batch_size самых старых постов базы using.
+
+    Берутся посты, опубликованные раньше before. Возвращает число
+    перенесённых постов; 0 - в базе больше нечего переносить.
+    """
+    posts = list(
+        Post.objects.using(using).filter(
+            pub_date__lt=before, image_pending=False
+        ).order_by('pub_date', 'id')[:batch_size]
+    )
+    if not posts:
+        return 0
+    ids = [post.id for post in posts]
+    comments = Comment.objects.using(using).filter(post_id__in=ids)
+    entries = FeedEntry.objects.filter(post_id__in=ids)
+    # Внешняя транзакция - горячей базы: с шардами архив в default
+    # фиксируется раньше, чем посты удаляются с шарда.
+    with transaction.atomic(using=using):
+        with transaction.atomic():
+            # Копия от прерванного запуска: id постов не повторяются.
+            ArchivedPost.objects.filter(id__in=ids).delete()
+            _copy(posts, comments)
+            readers = set(entries.values_list('user_id', flat=True))
+            entries.delete()
+            ImageJob.objects.filter(post_id__in=ids).delete()
+        comments._raw_delete(using)
+        Post.objects.using(using).filter(pk__in=ids)._raw_delete(using)
+    for post_id in ids:
+        cache.bump(f'post:{post_id}')
+        cache.bump(f'comments:{post_id}')
+    for user_id in readers:
+        cache.bump(f'feed:{user_id}')
+    return len(ids)
+
+
+def archive(before, batch_size):
+    """Переносит все посты старше before, порция за порцией.
+
+    Генератор: после каждой порции отдаёт базу и число постов в ней,
+    чтобы вызывающий мог вести журнал и делать паузы.
+    """
+    for using in sharding.databases():
+        while True:
+            moved = archive_batch(using, before, batch_size)
+            if not moved:
+                break
+            yield using, moved
@@ -0,0 +1,132 @@
+"""Замеры задержки и числа запросов основных страниц.
+
+seed() наполняет базу через importer, то есть так же, как массовый
+импорт: пачками, с лентами и счётчиками. run() прогоняет каждую
+страницу через тестовый клиент и возвращает перцентили задержки и
+число запросов к БД. Запускается командой bench_views, которая
+создаёт для замеров отдельную базу.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from posts.importer import Importer
+from posts.models import User
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'post_create', 'add_comment',
+)
+
+REQUESTS = {
+    'index': lambda rng, data: (
+        'get', reverse('posts:index'), None,
+    ),
+    'group_posts': lambda rng, data: (
+        'get', reverse('posts:group_list', args=(rng.choice(data['slugs']),)),
+        None,
+    ),
+    'profile': lambda rng, data: (
+        'get', reverse('posts:profile', args=(rng.choice(data['users']),)),
+        None,
+    ),
+    'post_detail': lambda rng, data: (
+        'get', reverse('posts:post_detail', args=(rng.randint(*data['ids']),)),
+        None,
+    ),
+    'follow_index': lambda rng, data: (
+        'get', reverse('posts:follow_index'), None,
+    ),
+    'post_create': lambda rng, data: (
+        'post', reverse('posts:post_create'), {'text': 'Замер'},
+    ),
+    'add_comment': lambda rng, data: (
+        'post',
+        reverse('posts:add_comment', args=(rng.randint(*data['ids']),)),
+        {'text': 'Замер'},
+    ),
+}
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def _records(volumes, rng):
+    users = [f'user{index}' for index in range(volumes['users'])]
+    slugs = [f'group{index}' for index in range(volumes['groups'])]
+    now = timezone.now()
+    for slug in slugs:
+        yield {'type': 'group', 'slug': slug, 'title': slug}
+    for index in range(1, volumes['posts'] + 1):
+        yield {
+            'type': 'post', 'id': index, 'author': rng.choice(users),
+            'group': rng.choice(slugs) if slugs else None,
+            'text': f'Пост {index} для замеров ' * 5,
+            'pub_date': (now - timedelta(minutes=index)).isoformat(),
+        }
+    for index in range(1, volumes['comments'] + 1):
+        yield {
+            'type': 'comment', 'id': index, 'author': rng.choice(users),
+            'post': rng.randint(1, volumes['posts']), 'text': 'Комментарий',
+        }
+    for user in users:
+        for author in rng.sample(users, min(volumes['follows'], len(users))):
+            yield {'type': 'follow', 'user': user, 'author': author}
+
+
+def seed(volumes, rng):
+    """Наполняет базу и возвращает то, что нужно для адресов запросов."""
+    importer = Importer()
+    for record in _records(volumes, rng):
+        importer.add(record)
+    importer.finish()
+    return {
+        'users': [f'user{index}' for index in range(volumes['users'])],
+        'slugs': [f'group{index}' for index in range(volumes['groups'])],
+        'ids': (1, volumes['posts']),
+    }
+
+
+def measure(client, view, data, rng, iterations, cold):
+    timings, queries = [], []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        method, url, payload = REQUESTS[view](rng, data)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, payload)
+            timings.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{view}: {url} ответил {response.status_code}')
+        queries.append(len(captured))
+    return {
+        'iterations': iterations,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': percentile(timings, 0.5) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'queries_mean': statistics.mean(queries),
+        'queries_max': max(queries),
+    }
+
+
+def run(data, rng, iterations, views=VIEWS, modes=('cold', 'warm')):
+    """Замеряет страницы; cold - с очисткой кэша перед каждым запросом."""
+    client = Client()
+    client.force_login(User.objects.get(username=data['users'][0]))
+    results = {}
+    for view in views:
+        for mode in modes:
+            results[f'{view}:{mode}'] = measure(
+                client, view, data, rng, iterations, mode == 'cold'
+            )
+    return results
@@ -0,0 +1,214 @@
+"""Версии кэшируемых объектов, кэш страниц и отрисованных статей.
+
+Версия - число в кэше, которое растёт при каждом изменении объекта.
+Ключи фрагментов включают версии, поэтому устаревшие фрагменты просто
+перестают запрашиваться и вытесняются сами. Начальная версия берётся
+из текущего времени: если счётчик вытеснят, старые ключи не оживут.
+Из тех же версий собираются ETag и Last-Modified страниц.
+"""
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from core import replicas
+from core.metrics import count_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+from posts.models import Group, User
+
+ARTICLE_TEMPLATE = 'posts/includes/article.html'
+ARTICLE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Возвращает словарь {scope: версия} одним запросом к кэшу."""
+    keys = {scope: _version_key(scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for scope, key in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), None)
+            found[key] = cache.get(key)
+        versions[scope] = found[key]
+    return versions
+
+
+def bump(scope):
+    """Делает недействительными все ключи, построенные на версии scope."""
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+    cache.set(_stamp_key(scope), time.time(), None)
+
+
+def _stamp_key(scope):
+    return f'stamp:{scope}'
+
+
+def last_changed(scopes):
+    """Время последнего bump() среди scopes, в секундах.
+
+    Если отметки нет (её вытеснили или scope ещё не менялся), она
+    заводится текущим временем: лишний ответ 200 лучше ложного 304.
+    """
+    keys = [_stamp_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time(), None)
+            found[key] = cache.get(key)
+    return max(found.values())
+
+
+def _article_scopes(post):
+    scopes = [f'post:{post.id}', f'user:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+def render_articles(posts, authorlink=False, grouplink=False):
+    """Отрисовывает статьи ленты, беря готовые фрагменты из кэша."""
+    posts = list(posts)
+    versions = get_versions(
+        {scope for post in posts for scope in _article_scopes(post)}
+    )
+    flags = f'{int(bool(authorlink))}{int(bool(grouplink))}'
+    keys = [
+        f'article:{post.id}:{flags}:' + '.'.join(
+            str(versions[scope]) for scope in _article_scopes(post)
+        )
+        for post in posts
+    ]
+    fragments = cache.get_many(keys)
+    count_cache('article', len(fragments), len(keys) - len(fragments))
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in fragments:
+            missing[key] = render_to_string(ARTICLE_TEMPLATE, {
+                'post': post,
+                'authorlink': authorlink,
+                'grouplink': grouplink,
+            })
+    if missing:
+        cache.set_many(missing, ARTICLE_TIMEOUT)
+        fragments.update(missing)
+    return [mark_safe(fragments[key]) for key in keys]
+
+
+def cache_page_versioned(timeout, scopes):
+    """cache_page, ключ которого включает версии scopes(request, **kwargs).
+
+    Сигналы поднимают версии при изменении постов, групп и авторов,
+    так что страницу можно держать в кэше долго: после записи
+    следующий запрос просто не найдёт старый ключ. В ключе и id
+    пользователя: шапка и кнопки подписки у каждого свои, а Vary: Cookie
+    SessionMiddleware добавляет уже после того, как ключ посчитан.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            versions = get_versions(scopes(request, **kwargs))
+            prefix = f'page:{request.user.pk or 0}:' + '.'.join(
+                str(versions[scope]) for scope in sorted(versions)
+            )
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def page_validators(scopes):
+    """condition() с ETag и Last-Modified из версий scopes(request, **kwargs).
+
+    Токены собираются из кэша версий, поэтому неизменившаяся страница
+    получает 304 до вызова вьюхи, кэша страниц и шаблонов. В ETag
+    входят id пользователя (шапка и кнопки у каждого свои) и кука CSRF:
+    после входа токен меняется, и старая страница с формой комментария
+    уже не отправится. If-Modified-Since при If-None-Match Django не
+    смотрит, так что last_login в Last-Modified этого не заменяет. Если
+    чтения идут с реплики, скопированной раньше last_changed, они
+    возвращаются в основную базу.
+    """
+    def get_scopes(request, kwargs):
+        if not hasattr(request, '_page_scopes'):
+            request._page_scopes = scopes(request, **kwargs)
+        return request._page_scopes
+
+    def etag(request, *args, **kwargs):
+        versions = get_versions(get_scopes(request, kwargs))
+        tokens = [
+            f'user={request.user.pk or 0}',
+            f'csrf={request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")}',
+        ] + [
+            f'{scope}={versions[scope]}' for scope in sorted(versions)
+        ]
+        return hashlib.md5('|'.join(tokens).encode()).hexdigest()
+
+    def get_changed(request, kwargs):
+        if not hasattr(request, '_page_changed'):
+            request._page_changed = last_changed(get_scopes(request, kwargs))
+        return request._page_changed
+
+    def last_modified(request, *args, **kwargs):
+        stamp = get_changed(request, kwargs)
+        if request.user.is_authenticated and request.user.last_login:
+            stamp = max(stamp, request.user.last_login.timestamp())
+        return datetime.fromtimestamp(stamp, timezone.utc)
+
+    def decorator(view):
+        return _fresh_replica(
+            condition(etag_func=etag, last_modified_func=last_modified)(view),
+            get_changed,
+        )
+    return decorator
+
+
+def _fresh_replica(view, get_changed):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if replicas.current():
+            replicas.ensure_fresh(get_changed(request, kwargs))
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def bump_group_pages(group_ids):
+    group_ids = [pk for pk in group_ids if pk is not None]
+    if group_ids:
+        for slug in Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True
+        ):
+            bump(f'page:group:{slug}')
+
+
+def bump_profile_pages(user_ids):
+    user_ids = [pk for pk in user_ids if pk is not None]
+    if user_ids:
+        for username in User.objects.filter(pk__in=user_ids).values_list(
+            'username', flat=True
+        ):
+            bump(f'page:profile:{username}')
+
+
+def bump_pages(group_ids=(), user_ids=()):
+    """Сбрасывает главную и страницы переданных групп и авторов."""
+    bump('page:index')
+    bump_group_pages(group_ids)
+    bump_profile_pages(user_ids)
@@ -0,0 +1,146 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Вызываются из сигналов моделей, поэтому срабатывают и во вьюхах, и в
+админке; вьюхи оборачивают запись в транзакцию, так что счётчик
+меняется атомарно вместе со строкой. Расхождения чинит команда
+reconcile_counters.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from posts import sharding
+from posts.models import ArchivedPost, Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE = 500
+
+
+def _bump_user(user_id, field, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    # Уменьшение строку не создаёт: при удалении пользователя каскад
+    # удаляет его посты и подписки уже после его счётчиков.
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(
+            **{field: F(field) + delta}
+        )
+
+
+def _bump_post(post_id, delta):
+    Post.objects.shard_of(post_id).filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def post_added(author_id):
+    _bump_user(author_id, 'posts_count', 1)
+
+
+def post_removed(author_id):
+    _bump_user(author_id, 'posts_count', -1)
+
+
+def comment_added(post_id):
+    _bump_post(post_id, 1)
+
+
+def comment_removed(post_id):
+    _bump_post(post_id, -1)
+
+
+def follow_added(user_id, author_id):
+    _bump_user(user_id, 'following_count', 1)
+    _bump_user(author_id, 'followers_count', 1)
+
+
+def follow_removed(user_id, author_id):
+    _bump_user(user_id, 'following_count', -1)
+    _bump_user(author_id, 'followers_count', -1)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def _post_totals():
+    """Число постов каждого автора: на всех шардах и в архиве."""
+    totals = Counter()
+    querysets = [ArchivedPost.objects] + [
+        Post.objects.using(alias) for alias in sharding.databases()
+    ]
+    for queryset in querysets:
+        totals.update(dict(
+            queryset.order_by().values_list('author').annotate(Count('pk'))
+        ))
+    return totals
+
+
+def _reconcile_comments(using):
+    posts = Post.objects.using(using).annotate(
+        actual_comments=_count(Comment.objects, 'post'),
+    ).exclude(
+        comments_count=F('actual_comments')
+    ).values_list('pk', 'actual_comments')
+    stale_posts = [
+        Post(pk=post_id, comments_count=actual)
+        for post_id, actual in posts.iterator()
+    ]
+    Post.objects.using(using).bulk_update(
+        stale_posts, ['comments_count'], batch_size=BATCH_SIZE
+    )
+    return len(stale_posts)
+
+
+def reconcile():
+    """Пересчитывает счётчики и исправляет разошедшиеся.
+
+    Посты и комментарии считаются на каждом шарде (posts.sharding) и
+    в архиве. Возвращает число исправленных строк пользователей и
+    постов.
+    """
+    UserStats.objects.bulk_create(
+        [
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    posts = _post_totals()
+    users = User.objects.annotate(
+        actual_followers=_count(Follow.objects, 'author'),
+        actual_following=_count(Follow.objects, 'user'),
+    ).values_list(
+        'pk', 'actual_followers', 'actual_following',
+        'stats__posts_count', 'stats__followers_count',
+        'stats__following_count',
+    )
+    stale_stats = [
+        UserStats(
+            user_id=row[0],
+            posts_count=posts[row[0]],
+            followers_count=row[1],
+            following_count=row[2],
+        )
+        for row in users.iterator()
+        if (posts[row[0]], row[1], row[2]) != row[3:6]
+    ]
+    UserStats.objects.bulk_update(
+        stale_stats,
+        ['posts_count', 'followers_count', 'following_count'],
+        batch_size=BATCH_SIZE,
+    )
+    stale_posts = sum(
+        _reconcile_comments(using) for using in sharding.databases()
+    )
+    return len(stale_stats), stale_posts
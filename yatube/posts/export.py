@@ -0,0 +1,83 @@
+"""Потоковая выгрузка постов и комментариев в NDJSON.
+
+Строки читаются курсором .iterator() пачками по CHUNK_SIZE и сразу
+отдаются потребителю, поэтому память не растёт вместе с таблицами.
+Последняя строка выгрузки содержит курсор since: если передать его в
+следующий раз, выгрузятся только записи, появившиеся после него.
+Архивные посты и комментарии выгружаются под своими исходными id
+перед горячими, поэтому курсор у обеих таблиц общий; пост, ушедший
+в архив после прошлой выгрузки, повторно не выгружается.
+"""
+import json
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from posts import sharding
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+CHUNK_SIZE = 2000
+CURSOR_SALT = 'posts.export.since'
+
+POST_FIELDS = ('text', 'pub_date', 'author__username', 'group__slug', 'image')
+COMMENT_FIELDS = ('post_id', 'author__username', 'text', 'created')
+# У архивного комментария исходный id хранится в source_id.
+COMMENT_SOURCES = ((ArchivedComment, 'source_id'), (Comment, 'id'))
+
+
+def parse_cursor(since):
+    """Разбирает курсор since; битый курсор - signing.BadSignature."""
+    if not since:
+        return {'p': 0, 'c': 0}
+    return signing.loads(since, salt=CURSOR_SALT)
+
+
+def _line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _rows(model, fields, after, key='id'):
+    return model.objects.filter(**{f'{key}__gt': after}).order_by(
+        key
+    ).values_list(key, *fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _posts(after):
+    for model in (ArchivedPost, Post):
+        for pk, text, pub_date, author, group, image in _rows(
+            model, POST_FIELDS, after
+        ):
+            yield pk, {
+                'type': 'post', 'id': pk, 'text': text,
+                'pub_date': pub_date, 'author': author, 'group': group,
+                'image': image or None,
+            }
+
+
+def _comments(after):
+    for model, key in COMMENT_SOURCES:
+        for pk, post_id, author, text, created in _rows(
+            model, COMMENT_FIELDS, after, key
+        ):
+            yield pk, {
+                'type': 'comment', 'id': pk, 'post': post_id,
+                'author': author, 'text': text, 'created': created,
+            }
+
+
+def export_lines(since=None):
+    """Генерирует строки NDJSON: посты, комментарии, затем курсор."""
+    sharding.require_unsharded('Выгрузка')
+    cursor = parse_cursor(since)
+    last_post, last_comment = cursor['p'], cursor['c']
+    for pk, record in _posts(cursor['p']):
+        last_post = max(last_post, pk)
+        yield _line(record)
+    for pk, record in _comments(cursor['c']):
+        last_comment = max(last_comment, pk)
+        yield _line(record)
+    yield _line({
+        'type': 'cursor',
+        'since': signing.dumps(
+            {'p': last_post, 'c': last_comment}, salt=CURSOR_SALT
+        ),
+    })
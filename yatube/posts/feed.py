@@ -0,0 +1,60 @@
+"""Материализованная лента подписок.
+
+Каждый пост при публикации раскладывается в ленты подписчиков автора,
+поэтому чтение /follow/ - один проход по индексу (user, -pub_date).
+"""
+from posts.models import FeedEntry, Follow, Post
+
+BATCH_SIZE = 500
+
+
+def _insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту постами автора, на которого подписались."""
+    posts = Post.objects.of_author(author_id).values_list('id', 'pub_date')
+    _insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def reassign(post):
+    """Перекладывает пост, у которого сменился автор, в нужные ленты."""
+    FeedEntry.objects.filter(post_id=post.id).delete()
+    fan_out(post)
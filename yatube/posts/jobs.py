@@ -0,0 +1,141 @@
+"""Очередь фоновой обработки картинок постов.
+
+Задачи лежат в таблице ImageJob и разбираются командой image_worker,
+которая выполняет их параллельно в пуле процессов. Пока картинка поста
+не обработана (Post.image_pending), шаблоны показывают заглушку.
+Упавшая задача повторяется с растущей паузой до MAX_ATTEMPTS раз.
+"""
+import io
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from posts import thumbnails
+from posts.models import ImageJob, Post
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+
+def enqueue(post, kind=ImageJob.REENCODE):
+    return ImageJob.objects.create(post=post, kind=kind)
+
+
+def claim(limit):
+    """Забирает до limit готовых к запуску задач и возвращает их id."""
+    token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            ImageJob.objects.filter(
+                status=ImageJob.PENDING, run_after__lte=now
+            ).order_by('id').values_list('id', flat=True)[:limit]
+        )
+        ImageJob.objects.filter(
+            id__in=ids, status=ImageJob.PENDING
+        ).update(status=ImageJob.RUNNING, worker=token, updated=now)
+    return list(
+        ImageJob.objects.filter(
+            worker=token, status=ImageJob.RUNNING
+        ).values_list('id', flat=True)
+    )
+
+
+def recover_stale():
+    """Возвращает в очередь задачи, брошенные упавшим воркером."""
+    return ImageJob.objects.filter(
+        status=ImageJob.RUNNING,
+        updated__lt=timezone.now() - STALE_AFTER,
+    ).update(status=ImageJob.PENDING, worker='')
+
+
+def reencode(post):
+    """Уменьшает картинку до POST_IMAGE_MAX_SIZE и пережимает её."""
+    with post.image.open('rb') as source:
+        image = Image.open(source)
+        image_format = image.format
+        if getattr(image, 'is_animated', False):
+            return
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(settings.POST_IMAGE_MAX_SIZE)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    # Старый файл удаляется последним: если запись упадёт, пост
+    # останется со своей картинкой, а не со ссылкой в пустоту.
+    storage = post.image.storage
+    name = post.image.name
+    saved_name = storage.save(name, ContentFile(buffer.getvalue()))
+    Post.objects.shard_of(post.pk).filter(pk=post.pk).update(
+        image=saved_name
+    )
+    post.image.name = saved_name
+    storage.delete(name)
+
+
+def _finish(post):
+    """Снимает заглушку, если у поста не осталось незавершённых задач."""
+    unfinished = post.image_jobs.filter(
+        status__in=(ImageJob.PENDING, ImageJob.RUNNING)
+    )
+    if not unfinished.exists():
+        post.image_pending = False
+        post.save(update_fields=['image_pending'])
+
+
+def run_job(job_id):
+    """Выполняет задачу; вызывается в процессе пула воркера."""
+    try:
+        job = ImageJob.objects.get(pk=job_id)
+    except ImageJob.DoesNotExist:
+        # Пост удалили вместе с задачами, пока задача ждала пула.
+        logger.warning('Задача %s удалена до запуска', job_id)
+        return ImageJob.FAILED
+    try:
+        # Пост читается отдельным запросом: он может лежать на шарде.
+        post = job.post
+    except Post.DoesNotExist:
+        logger.warning('Пост задачи %s удалён', job.pk)
+        job.status = ImageJob.FAILED
+        job.error = 'Пост удалён'
+        job.save()
+        return job.status
+    try:
+        if job.kind == ImageJob.REENCODE:
+            reencode(post)
+        else:
+            thumbnails.generate(post)
+    except Exception as error:
+        logger.exception('Задача %s для поста %s упала', job.pk, post.pk)
+        job.attempts += 1
+        job.error = f'{type(error).__name__}: {error}'
+        if job.attempts < MAX_ATTEMPTS:
+            job.status = ImageJob.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=2 ** job.attempts
+            )
+        else:
+            job.status = ImageJob.FAILED
+        job.save()
+    else:
+        job.status = ImageJob.DONE
+        job.error = ''
+        job.save()
+        if job.kind == ImageJob.REENCODE:
+            enqueue(post, ImageJob.THUMBNAIL)
+    _finish(post)
+    return job.status
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше POST_ARCHIVE_AFTER_DAYS дней вместе с '
+        'комментариями в архивные таблицы порциями по POST_ARCHIVE_BATCH.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.POST_ARCHIVE_AFTER_DAYS,
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.POST_ARCHIVE_BATCH,
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза в секундах между порциями, чтобы не мешать записи.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        batches = archive.archive(
+            archive.cutoff(options['days']), options['batch_size']
+        )
+        for using, moved in batches:
+            total += moved
+            self.stdout.write(f'{using}: перенесено постов {moved}')
+            time.sleep(options['pause'])
+        self.stdout.write(f'Всего перенесено в архив: {total}.')
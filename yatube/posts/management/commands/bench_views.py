@@ -0,0 +1,113 @@
+import json
+import os
+import random
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from posts import benchmarks
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет отдельную базу заданным объёмом данных и замеряет '
+        'задержку и число запросов основных страниц. Результат в JSON '
+        'для сравнения между коммитами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок у каждого пользователя.',
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--view', action='append', choices=benchmarks.VIEWS,
+            dest='views', help='Замерять только эти страницы.',
+        )
+        parser.add_argument('--output', help='Файл для результата в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого замера для сравнения p50.',
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] < 1 or options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и пост.')
+        volumes = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            results = self.run_isolated(directory, volumes, options)
+        report = {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'volumes': volumes,
+            'results': results,
+        }
+        self.print_table(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def run_isolated(self, directory, volumes, options):
+        """Замер на временных базе и кэше, рабочие данные не трогаются."""
+        caches = {'default': {
+            **settings.CACHES['default'],
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        }}
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            directory, 'bench.sqlite3'
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                CACHES=caches, ALLOWED_HOSTS=['testserver']
+            ):
+                rng = random.Random(options['seed'])
+                data = benchmarks.seed(volumes, rng)
+                return benchmarks.run(
+                    data, rng, options['iterations'],
+                    options['views'] or benchmarks.VIEWS,
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def print_table(self, results, compare):
+        previous = {}
+        if compare:
+            with open(compare, encoding='utf-8') as stream:
+                previous = json.load(stream)['results']
+        self.stdout.write(
+            f'{"страница":<20} {"p50 мс":>8} {"p95 мс":>8} {"p99 мс":>8} '
+            f'{"запросов":>9} {"p50 было":>9}'
+        )
+        for name, result in results.items():
+            before = previous.get(name, {}).get('p50_ms')
+            change = f'{before:>9.2f}' if before is not None else ' ' * 9
+            self.stdout.write(
+                f'{name:<20} {result["p50_ms"]:>8.2f} '
+                f'{result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                f'{result["queries_mean"]:>9.1f} {change}'
+            )
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from posts.models import Comment, FeedEntry, Group, Post, User
+from posts.utils import KeysetPaginator
+from posts.views import N_POST
+
+
+class Command(BaseCommand):
+    help = 'Показывает план выполнения основного запроса каждой страницы.'
+
+    def handle(self, *args, **options):
+        for name, queryset in self.get_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
+
+    @staticmethod
+    def first_page(queryset, ordering=('-pub_date', '-id')):
+        return queryset.order_by(*ordering)[:N_POST + 1]
+
+    @staticmethod
+    def deep_page(queryset, ordering=('-pub_date', '-id')):
+        keyset = KeysetPaginator(queryset, N_POST, ordering)
+        seek = keyset._seek([timezone.now(), 0], False)
+        return queryset.filter(seek).order_by(*ordering)[:N_POST + 1]
+
+    def get_queries(self):
+        group = Group.objects.first() or Group(id=0)
+        user = User.objects.first() or User(id=0)
+        post = Post.objects.first() or Post(id=0)
+        posts = Post.objects.for_listing()
+        feed = FeedEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+        feed_ordering = ('-pub_date', '-post_id')
+        comments = Comment.objects.for_listing().filter(post=post)
+        comment_ordering = ('created', 'id')
+        return (
+            ('index', self.first_page(posts)),
+            ('index (курсор)', self.deep_page(posts)),
+            ('group_posts', self.first_page(posts.filter(group=group))),
+            (
+                'group_posts (курсор)',
+                self.deep_page(posts.filter(group=group)),
+            ),
+            ('profile', self.first_page(posts.filter(author=user))),
+            ('profile (курсор)', self.deep_page(posts.filter(author=user))),
+            ('follow_index', self.first_page(feed, feed_ordering)),
+            (
+                'follow_index (курсор)',
+                self.deep_page(feed, feed_ordering),
+            ),
+            (
+                'post_detail (комментарии)',
+                self.first_page(comments, comment_ordering),
+            ),
+            (
+                'post_comments (курсор)',
+                self.deep_page(comments, comment_ordering),
+            ),
+        )
@@ -0,0 +1,37 @@
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from posts import export, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты и комментарии в NDJSON. С --since выгружаются '
+        'только записи, появившиеся после прошлой выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', default='',
+            help='Курсор из последней строки прошлой выгрузки.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для записи, по умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sharding.require_unsharded('Выгрузка')
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        try:
+            export.parse_cursor(options['since'])
+        except signing.BadSignature:
+            raise CommandError('Неверный курсор --since.')
+        lines = export.export_lines(options['since'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(lines)
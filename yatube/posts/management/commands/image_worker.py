@@ -0,0 +1,45 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from posts import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает очередь обработки картинок постов пулом процессов: '
+        'уменьшает загруженные картинки и готовит миниатюры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+        )
+        parser.add_argument(
+            '--poll', type=float, default=2.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=django.setup,
+        ) as pool:
+            while True:
+                jobs.recover_stale()
+                ids = jobs.claim(workers * 2)
+                for job_id, status in zip(ids, pool.map(jobs.run_job, ids)):
+                    self.stdout.write(f'Задача {job_id}: {status}')
+                if options['once'] and not ids:
+                    return
+                if not ids:
+                    time.sleep(options['poll'])
@@ -0,0 +1,70 @@
+import csv
+import json
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from posts import importer
+
+
+def read_ndjson(stream, kind):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream, kind):
+    for row in csv.DictReader(stream):
+        row.setdefault('type', kind)
+        yield row
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует группы, посты, комментарии и подписки из файлов '
+        'NDJSON (формат export_ndjson) или CSV пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path')
+        parser.add_argument(
+            '--type', choices=importer.KINDS,
+            help='Тип записей CSV-файла без колонки type.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            loader = importer.Importer(options['batch_size'])
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        start = time.perf_counter()
+        for path in options['paths']:
+            self.load(loader, path, options['type'])
+        try:
+            counts = loader.finish()
+        except (KeyError, ValueError, IntegrityError) as error:
+            raise CommandError(f'Ошибка в последней пачке: {error!r}')
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        for kind in importer.KINDS:
+            self.stdout.write(f'{kind}: {counts[kind]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано {total} строк за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк/с).'
+        ))
+
+    def load(self, loader, path, kind):
+        read = read_csv if path.endswith('.csv') else read_ndjson
+        with open(path, encoding='utf-8', newline='') as stream:
+            number = 0
+            try:
+                for number, record in enumerate(read(stream, kind), 1):
+                    loader.add(record)
+            except (KeyError, ValueError, IntegrityError) as error:
+                raise CommandError(
+                    f'{path}: ошибка после {number} записей: {error!r}'
+                )
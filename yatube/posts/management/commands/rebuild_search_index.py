@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from posts import search, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие таблицу и триггеры полнотекстового индекса '
+        'постов и перестраивает индекс в каждой базе с постами.'
+    )
+
+    def handle(self, *args, **options):
+        for using in sharding.databases():
+            search.install(connections[using])
+            self.stdout.write(f'{using}: поисковый индекс перестроен.')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        users, posts = counters.reconcile()
+        self.stdout.write(
+            f'Исправлено счётчиков: пользователей {users}, постов {posts}.'
+        )
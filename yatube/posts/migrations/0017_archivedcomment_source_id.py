@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_source_ids(apps, schema_editor):
+    ArchivedComment = apps.get_model('posts', 'ArchivedComment')
+    ArchivedComment.objects.update(source_id=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='source_id',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.RunPython(fill_source_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedcomment',
+            name='source_id',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='archivedcomment',
+            name='id',
+            field=models.AutoField(
+                auto_created=True, primary_key=True, serialize=False,
+                verbose_name='ID',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedcomment',
+            constraint=models.UniqueConstraint(
+                fields=('post', 'source_id'), name='unique_archived_comment'
+            ),
+        ),
+    ]
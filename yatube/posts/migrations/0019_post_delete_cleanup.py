@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_postsequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedentry',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='feed_entries', to='posts.Post'),
+        ),
+        migrations.AlterField(
+            model_name='imagejob',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='image_jobs', to='posts.Post'),
+        ),
+    ]
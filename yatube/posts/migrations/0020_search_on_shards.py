@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from posts import search
+    search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """Индекс поиска на шардах: 0015 без подсказки модели их пропускала."""
+
+    dependencies = [
+        ('posts', '0019_post_delete_cleanup'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            install, migrations.RunPython.noop, hints={'model_name': 'post'},
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from posts import sharding
 
 User = get_user_model()
 
@@ -13,7 +15,32 @@ class Group(models.Model):
         return self.title
 
 
+class ShardedQuerySet(models.QuerySet):
+    def shard_of(self, post_id):
+        """Запрос к шарду поста post_id (см. posts.sharding)."""
+        return self.using(sharding.shard_for_post(post_id))
+
+    def with_related(self, *fields):
+        """select_related, а на шардах - prefetch_related из default."""
+        if sharding.enabled():
+            return self.prefetch_related(*fields)
+        return self.select_related(*fields)
+
+
+class PostQuerySet(ShardedQuerySet):
+    def for_listing(self):
+        """Посты вместе с автором и группой, которые выводят шаблоны."""
+        return self.with_related('author', 'group')
+
+    def of_author(self, author_id):
+        return self.using(sharding.shard_for_author(author_id)).filter(
+            author_id=author_id
+        )
+
+
 class Post(models.Model):
+    archived = False
+
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст нового поста',
@@ -42,15 +69,53 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.IntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+    image_pending = models.BooleanField(
+        'Картинка обрабатывается',
+        default=False,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['group', '-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date', '-id']),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self.pk is not None or not sharding.enabled():
+            super().save(*args, **kwargs)
+            return
+        using = sharding.shard_for_author(self.author_id)
+        with transaction.atomic(using=using):
+            self.pk = sharding.next_post_id(using)
+            kwargs.update(force_insert=True, using=using)
+            super().save(*args, **kwargs)
+
+
+class PostSequence(models.Model):
+    """Последний выданный id поста на шарде, см. sharding.next_post_id."""
+    last_id = models.BigIntegerField()
+
+
+class CommentQuerySet(ShardedQuerySet):
+    def for_listing(self):
+        """Комментарии вместе с авторами."""
+        return self.with_related('author')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -68,6 +133,20 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # QuerySet.create() передаёт using без подсказки instance,
+        # поэтому шард поста выбирается здесь.
+        if sharding.enabled():
+            kwargs['using'] = sharding.shard_for_post(self.post_id)
+        super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -80,3 +159,194 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Пост в ленте подписчика, записывается при публикации (fan-out)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+    )
+    post = models.ForeignKey(
+        Post,
+        # Удаляет signals.post_deleting: каскад Django ищет строки в
+        # базе поста, а с шардами их там нет.
+        on_delete=models.DO_NOTHING,
+        related_name='feed_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post']),
+            models.Index(fields=['user', 'author']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются вместе с постами и подписками."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.IntegerField('Постов', default=0)
+    followers_count = models.IntegerField('Подписчиков', default=0)
+    following_count = models.IntegerField('Подписок', default=0)
+
+
+class ImageJob(models.Model):
+    """Фоновая обработка картинки поста, см. posts.jobs."""
+    REENCODE = 'reencode'
+    THUMBNAIL = 'thumbnail'
+    KINDS = (
+        (REENCODE, 'Уменьшение и перекодирование'),
+        (THUMBNAIL, 'Миниатюры'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        # Удаляет signals.post_deleting: каскад Django ищет строки в
+        # базе поста, а с шардами их там нет.
+        on_delete=models.DO_NOTHING,
+        related_name='image_jobs',
+    )
+    kind = models.CharField('Тип', max_length=16, choices=KINDS)
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    worker = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+
+class ArchivedPostQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('author', 'group')
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из posts_post командой archive_posts.
+
+    id и поля те же, что у Post, поэтому шаблоны и курсоры списков
+    работают с ним как с обычным постом. Архивные посты только
+    читаются: комментировать и редактировать их нельзя.
+    """
+    archived = True
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='archived_posts',
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    comments_count = models.IntegerField('Комментариев', default=0)
+    archived_at = models.DateTimeField('В архиве с', auto_now_add=True)
+
+    objects = ArchivedPostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Пост в архиве'
+        verbose_name_plural = 'Посты в архиве'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['group', '-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date', '-id']),
+        ]
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedCommentQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('author')
+
+
+class ArchivedComment(models.Model):
+    """Комментарий архивного поста.
+
+    С шардами id комментариев уникальны только внутри шарда, поэтому
+    у архива свои id, а исходный хранится в source_id.
+    """
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+    )
+    text = models.TextField()
+    created = models.DateTimeField()
+    source_id = models.IntegerField()
+
+    objects = ArchivedCommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'source_id'],
+                name='unique_archived_comment',
+            ),
+        ]
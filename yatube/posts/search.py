@@ -0,0 +1,118 @@
+"""Полнотекстовый поиск по тексту постов.
+
+Индекс - виртуальная таблица SQLite FTS5 posts_post_fts с внешним
+содержимым posts_post; триггеры на вставку, изменение текста и
+удаление держат её в актуальном состоянии, в том числе при
+bulk_create и queryset.update. Пересоздание таблицы при миграциях
+SQLite теряет триггеры, их возвращает команда rebuild_search_index.
+С шардированием у каждого шарда свой индекс, выдачу собирает
+ScatterKeysetPaginator. На других СУБД поиск откатывается к icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from posts.models import Post
+
+TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+INSTALL_SQL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')",
+)
+
+UNINSTALL_SQL = (
+    f'DROP TRIGGER IF EXISTS {TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TABLE}_update',
+    f'DROP TABLE IF EXISTS {TABLE}',
+)
+
+
+def enabled(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """Создаёт индекс и триггеры, если их нет, и перестраивает индекс."""
+    if not enabled(using):
+        return
+    with using.cursor() as cursor:
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+
+
+def uninstall(using=connection):
+    if not enabled(using):
+        return
+    with using.cursor() as cursor:
+        for statement in UNINSTALL_SQL:
+            cursor.execute(statement)
+
+
+def build_query(text):
+    """Превращает ввод пользователя в запрос FTS5.
+
+    Каждое слово берётся в кавычки (операторы FTS5 из ввода не
+    работают) и ищется по префиксу; слова объединяются через AND.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(text))
+
+
+def search(text, queryset=None):
+    """Посты, подходящие под запрос, с релевантностью в поле rank.
+
+    Чем меньше rank, тем выше пост в выдаче (bm25 в FTS5 отрицателен).
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    query = build_query(text)
+    if not query:
+        return queryset.none().annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    if not enabled():
+        return queryset.filter(text__icontains=text).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.extra(
+        tables=[TABLE],
+        where=[f'{TABLE}.rowid = posts_post.id', f'{TABLE} MATCH %s'],
+        params=[query],
+    ).annotate(rank=RawSQL(f'{TABLE}.rank', (), output_field=FloatField()))
+
+
+def matching(queryset, text):
+    """Фильтр по индексу без ранжирования - для поиска в админке."""
+    query = build_query(text)
+    if not query:
+        return queryset.none()
+    if not enabled():
+        return queryset.filter(text__icontains=text)
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+                      (query,))
+    )
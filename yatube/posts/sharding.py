@@ -0,0 +1,176 @@
+"""Шардирование постов и комментариев по автору.
+
+Базы POST_SHARDS хранят только посты, комментарии и счётчик id постов;
+пользователи, группы, подписки, ленты и всё остальное остаются в
+default. Пост живёт на шарде автора, комментарий - на шарде поста.
+id поста глобально уникален и сам указывает на шард: остаток от
+деления на число шардов - номер шарда. Поэтому пост находится по
+id одним запросом, а комментарии - по post_id.
+
+ShardRouter выбирает базу по подсказке instance: author.posts идёт на
+шард автора, post.comments и entry.post - на шард поста, а post.author
+и post.group - обратно в default. Запросы без подсказки шард выбирают
+сами через shard_of() у менеджеров. Списки сразу по всем авторам
+(главная, группа) собирает ScatterKeysetPaginator, ленту - gather().
+
+Выгрузка и импорт работают только без шардов (require_unsharded).
+Пустой POST_SHARDS выключает шардирование, всё лежит в default.
+"""
+from collections import defaultdict
+
+from core import replicas
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Max, prefetch_related_objects
+
+SHARDED = ('posts.Post', 'posts.Comment')
+# Таблицы шарда: посты, комментарии и счётчик id постов.
+SHARD_TABLES = SHARDED + ('posts.PostSequence',)
+
+
+def enabled():
+    return bool(settings.POST_SHARDS)
+
+
+def databases():
+    """Базы с постами и комментариями: шарды или default."""
+    return settings.POST_SHARDS or [DEFAULT_DB_ALIAS]
+
+
+def require_unsharded(feature):
+    """Ошибка для функций, которые читают и пишут только default.
+
+    Без неё они молча работали бы с пустыми таблицами default.
+    """
+    if enabled():
+        raise ImproperlyConfigured(
+            f'{feature} не работает с шардированием: уберите DB_SHARDS.'
+        )
+
+
+def shard_for_author(author_id):
+    """Шард для новых постов автора или None без шардирования."""
+    if not enabled():
+        return None
+    return settings.POST_SHARDS[author_id % len(settings.POST_SHARDS)]
+
+
+def shard_for_post(post_id):
+    """Шард поста и его комментариев или None без шардирования."""
+    if not enabled():
+        return None
+    return settings.POST_SHARDS[int(post_id) % len(settings.POST_SHARDS)]
+
+
+def _last_post_id(alias):
+    """Наибольший занятый id: на шарде alias или в архиве."""
+    found = [
+        apps.get_model(label)._base_manager.using(using).aggregate(
+            last=Max('pk')
+        )['last']
+        for label, using in (
+            ('posts.Post', alias), ('posts.ArchivedPost', DEFAULT_DB_ALIAS),
+        )
+    ]
+    return max(filter(None, found), default=0)
+
+
+def next_post_id(alias):
+    """Следующий id поста на шарде alias.
+
+    Счётчик PostSequence на шарде только растёт, поэтому id удалённых
+    и перенесённых в архив постов новым постам не достаются. Первый раз
+    он начинается после наибольшего занятого id. Вызывается в
+    транзакции шарда: BEGIN IMMEDIATE профиля production не даёт двум
+    записям взять одно значение.
+    """
+    count = len(settings.POST_SHARDS)
+    sequence = apps.get_model('posts.PostSequence')._base_manager.using(alias)
+    if sequence.filter(pk=1).update(last_id=F('last_id') + count):
+        return sequence.values_list('last_id', flat=True).get(pk=1)
+    first = (_last_post_id(alias) // count + 1) * count
+    first += settings.POST_SHARDS.index(alias)
+    sequence.create(pk=1, last_id=first)
+    return first
+
+
+def _row_shard(model, instance):
+    label = instance._meta.label
+    if label == 'posts.Post':
+        if instance.pk is not None:
+            return shard_for_post(instance.pk)
+        return shard_for_author(instance.author_id)
+    if label == settings.AUTH_USER_MODEL and model._meta.label == 'posts.Post':
+        return shard_for_author(instance.pk)
+    if getattr(instance, 'post_id', None) is not None:
+        return shard_for_post(instance.post_id)
+    return None
+
+
+class ShardRouter:
+    def _route(self, model, hints, unsharded):
+        if not enabled():
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if model._meta.label in SHARDED:
+            return _row_shard(model, instance)
+        if instance._meta.label in SHARDED:
+            return unsharded
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(
+            model, hints, replicas.current() or DEFAULT_DB_ALIAS
+        )
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, DEFAULT_DB_ALIAS)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in settings.POST_SHARDS:
+            return None
+        return f'{app_label}.{model_name}' in {
+            label.lower() for label in SHARD_TABLES
+        }
+
+
+def scatter(queryset, ordering, limit, key):
+    """Первые limit строк queryset со всех шардов, слитые по key.
+
+    prefetch_related выполняется один раз для итоговых строк, а не
+    на каждом шарде.
+    """
+    lookups = queryset._prefetch_related_lookups
+    queryset = queryset.prefetch_related(None).order_by(*ordering)
+    rows = []
+    for alias in settings.POST_SHARDS:
+        rows.extend(queryset.using(alias)[:limit])
+    rows.sort(key=key, reverse=ordering[0].startswith('-'))
+    rows = rows[:limit]
+    prefetch_related_objects(rows, *lookups)
+    return rows
+
+
+def gather(queryset, ids):
+    """Строки с первичными ключами ids в их порядке, по запросу на шард."""
+    lookups = queryset._prefetch_related_lookups
+    queryset = queryset.prefetch_related(None)
+    by_shard = defaultdict(list)
+    for pk in ids:
+        by_shard[shard_for_post(pk)].append(pk)
+    found = {}
+    for alias, shard_ids in by_shard.items():
+        found.update(
+            (row.pk, row)
+            for row in queryset.using(alias).filter(pk__in=shard_ids)
+        )
+    rows = [found[pk] for pk in ids if pk in found]
+    prefetch_related_objects(rows, *lookups)
+    return rows
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from posts import cache, counters, feed, jobs, sharding
+from posts.models import (Comment, FeedEntry, Follow, Group, ImageJob, Post,
+                          User, UserStats)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        cache.bump(f'page:profile:{instance.username}')
+    elif update_fields is None or set(update_fields) != {'last_login'}:
+        cache.bump(f'user:{instance.id}')
+        cache.bump('page:index')
+        cache.bump('page:names')
+        cache.bump(f'page:profile:{instance.username}')
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """Удаляет с шардов посты и комментарии пользователя.
+
+    Каскад Django видит только default, а внешние ключи SQLite при
+    шардировании выключены, так что без этого строки остались бы на
+    шардах без автора.
+    """
+    if not sharding.enabled():
+        return
+    for alias in settings.POST_SHARDS:
+        Comment.objects.using(alias).filter(author_id=instance.pk).delete()
+    posts = Post.objects.of_author(instance.pk)
+    ids = list(posts.values_list('id', flat=True))
+    group_ids = set(posts.values_list('group_id', flat=True))
+    ImageJob.objects.filter(post_id__in=ids).delete()
+    using = sharding.shard_for_author(instance.pk)
+    Comment.objects.using(using).filter(post_id__in=ids)._raw_delete(using)
+    posts._raw_delete(using)
+    cache.bump_pages(group_ids)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        cache.bump(f'group:{instance.id}')
+        cache.bump('page:index')
+        cache.bump('page:names')
+    cache.bump(f'page:group:{instance.slug}')
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    cache.bump('page:index')
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous = None
+    instance._image_changed = False
+    if raw:
+        return
+    if instance.pk:
+        instance._previous = Post.objects.shard_of(instance.pk).filter(
+            pk=instance.pk
+        ).values('author_id', 'group_id', 'image').first()
+    if update_fields is None or 'image' in update_fields:
+        previous_image = (instance._previous or {}).get('image') or ''
+        if instance.image and instance.image.name != previous_image:
+            instance.image_pending = True
+            instance._image_changed = True
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_image_changed', False):
+        jobs.enqueue(instance)
+    if created:
+        feed.fan_out(instance)
+        counters.post_added(instance.author_id)
+        cache.bump_pages([instance.group_id], [instance.author_id])
+        return
+    cache.bump(f'post:{instance.id}')
+    previous = getattr(instance, '_previous', None) or {}
+    cache.bump_pages(
+        [instance.group_id, previous.get('group_id')],
+        [instance.author_id, previous.get('author_id')],
+    )
+    if previous and previous['author_id'] != instance.author_id:
+        counters.post_removed(previous['author_id'])
+        counters.post_added(instance.author_id)
+        feed.reassign(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    FeedEntry.objects.filter(post_id=instance.pk).delete()
+    ImageJob.objects.filter(post_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_removed(instance.author_id)
+    cache.bump_pages([instance.group_id], [instance.author_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_added(instance.post_id)
+        cache.bump(f'comments:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_removed(instance.post_id)
+    cache.bump(f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+        counters.follow_added(instance.user_id, instance.author_id)
+        cache.bump_profile_pages([instance.user_id, instance.author_id])
+        cache.bump(f'feed:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+    counters.follow_removed(instance.user_id, instance.author_id)
+    cache.bump_profile_pages([instance.user_id, instance.author_id])
+    cache.bump(f'feed:{instance.user_id}')
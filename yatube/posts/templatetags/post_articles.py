@@ -0,0 +1,10 @@
+from django import template
+from posts.cache import render_articles
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_articles(posts, authorlink=False, grouplink=False):
+    """Готовый HTML статей из posts/includes/article.html."""
+    return render_articles(posts, authorlink, grouplink)
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts import archive
+from posts.models import (ArchivedComment, ArchivedPost, Comment, FeedEntry,
+                          Follow, Group, Post, User, UserStats)
+
+OLD_POSTS = 7
+NEW_POSTS = 8
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=self.author, group=self.group
+            )
+            for index in range(OLD_POSTS + NEW_POSTS)
+        ]
+        self.old = posts[:OLD_POSTS]
+        long_ago = timezone.now() - timedelta(days=400)
+        for index, post in enumerate(self.old):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=long_ago + timedelta(minutes=index)
+            )
+        Comment.objects.create(
+            post=self.old[-1], author=self.reader, text='Старый комментарий'
+        )
+        self.newest_first = [post.id for post in reversed(posts)]
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def run_archive(self, batch_size=3):
+        return list(archive.archive(archive.cutoff(365), batch_size))
+
+    def test_old_posts_move_in_batches(self):
+        batches = self.run_archive()
+        self.assertEqual([moved for _, moved in batches], [3, 3, 1])
+        self.assertEqual(Post.objects.count(), NEW_POSTS)
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list('id', flat=True)),
+            {post.id for post in self.old},
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            ArchivedComment.objects.get().post_id, self.old[-1].id
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(
+                post_id__in=[post.id for post in self.old]
+            ).exists()
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count,
+            OLD_POSTS + NEW_POSTS,
+        )
+        self.assertEqual(self.run_archive(), [])
+
+    def test_post_detail_finds_archived_post(self):
+        post = self.old[-1]
+        self.run_archive()
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.id,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['post'].archived)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Старый комментарий'],
+        )
+        self.assertContains(response, 'комментарии закрыты')
+
+    def test_cursor_pagination_continues_into_archive(self):
+        self.run_archive()
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                second = self.client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.id for post in first] + [post.id for post in second],
+                    self.newest_first,
+                )
+                self.assertFalse(second.has_next())
+                back = self.client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_page_numbers_continue_into_archive(self):
+        self.run_archive()
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                first = self.client.get(url, {'page': 1}).context['page_obj']
+                second = self.client.get(url, {'page': 2}).context['page_obj']
+                self.assertEqual(first.paginator.count, OLD_POSTS + NEW_POSTS)
+                self.assertEqual(
+                    [post.id for post in first] + [post.id for post in second],
+                    self.newest_first,
+                )
@@ -0,0 +1,23 @@
+import random
+
+from django.test import TestCase
+from posts import benchmarks
+from posts.models import FeedEntry, Post, User
+
+VOLUMES = {'users': 3, 'groups': 2, 'posts': 12, 'comments': 5, 'follows': 2}
+
+
+class BenchmarksTest(TestCase):
+    def test_seed_and_run(self):
+        rng = random.Random(1)
+        data = benchmarks.seed(VOLUMES, rng)
+        self.assertEqual(Post.objects.count(), VOLUMES['posts'])
+        self.assertEqual(User.objects.count(), VOLUMES['users'])
+        self.assertTrue(FeedEntry.objects.exists())
+        results = benchmarks.run(data, rng, 2)
+        self.assertEqual(len(results), len(benchmarks.VIEWS) * 2)
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertEqual(result['iterations'], 2)
+                self.assertGreater(result['queries_max'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
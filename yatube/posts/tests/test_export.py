@@ -0,0 +1,83 @@
+import io
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts import archive
+from posts.models import Comment, Group, Post, User
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий',
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def export(self, since=''):
+        response = self.client.get(reverse('posts:export'), {'since': since})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_streams_posts_and_comments(self):
+        records = self.export()
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['post', 'comment', 'cursor'],
+        )
+        self.assertEqual(records[0]['author'], 'author')
+        self.assertEqual(records[0]['group'], 'group')
+        self.assertEqual(records[1]['post'], self.post.id)
+
+    def test_since_cursor_is_incremental(self):
+        since = self.export()[-1]['since']
+        self.assertEqual([r['type'] for r in self.export(since)], ['cursor'])
+        new_post = Post.objects.create(author=self.user, text='Второй пост')
+        records = self.export(since)
+        self.assertEqual(records[0]['id'], new_post.id)
+        self.assertEqual(len(records), 2)
+
+    def test_export_includes_archive(self):
+        comment_id = Comment.objects.get().id
+        since = self.export()[-1]['since']
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        list(archive.archive(archive.cutoff(365), 10))
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual([r['type'] for r in self.export(since)], ['cursor'])
+        records = self.export()
+        self.assertEqual(
+            [(r['type'], r.get('id')) for r in records[:-1]],
+            [('post', self.post.id), ('comment', comment_id)],
+        )
+        self.assertEqual(records[1]['post'], self.post.id)
+
+    def test_export_access_and_bad_cursor(self):
+        url = reverse('posts:export')
+        response = self.client.get(url, {'since': 'bad'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_export_command(self):
+        output = io.StringIO()
+        call_command('export_ndjson', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[-1])['type'], 'cursor')
@@ -5,7 +5,10 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from posts import thumbnails
 from posts.models import Comment, Post, User
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -121,3 +124,18 @@ class TestCreateFormTests(TestCase):
                 author=self.user,
             ).exists()
         )
+
+    def test_thumbnails_pregenerated(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=self.small_gif,
+                content_type='image/gif',
+            ),
+        )
+        source = ImageFile(post.image)
+        self.assertIsNone(default.kvstore.get(source))
+        thumbnails.generate(post)
+        self.assertIsNotNone(default.kvstore.get(source))
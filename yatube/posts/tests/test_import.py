@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+RECORDS = [
+    {'type': 'group', 'slug': 'old', 'title': 'Старая группа'},
+    {'type': 'post', 'id': 100, 'text': 'Старый пост', 'author': 'writer',
+     'group': 'old', 'pub_date': '2015-03-01T10:00:00+00:00'},
+    {'type': 'comment', 'id': 7, 'post': 100, 'author': 'reader',
+     'text': 'Ответ'},
+    {'type': 'follow', 'user': 'reader', 'author': 'writer'},
+]
+
+
+class ImportCommandTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def run_import(self, *args):
+        call_command('import_data', *args, stdout=io.StringIO())
+
+    def test_import_ndjson(self):
+        path = self.write(
+            'dump.ndjson', ''.join(json.dumps(r) + '\n' for r in RECORDS)
+        )
+        self.run_import(path, '--batch-size', '2')
+        self.run_import(path)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, Group.objects.get(slug='old'))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        reader = User.objects.get(username='reader')
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=post.author).exists()
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(user=reader, post=post).exists()
+        )
+        self.assertEqual(post.author.stats.posts_count, 1)
+        self.assertEqual(post.author.stats.followers_count, 1)
+
+    def test_import_csv(self):
+        path = self.write(
+            'posts.csv', 'text,author,group\nПервый,writer,\nВторой,writer,\n'
+        )
+        self.run_import(path, '--type', 'post')
+        self.assertEqual(
+            Post.objects.filter(author__username='writer').count(), 2
+        )
+
+    def test_unknown_group(self):
+        path = self.write(
+            'bad.ndjson',
+            json.dumps({'type': 'post', 'text': 'Т', 'author': 'writer',
+                        'group': 'missing'}) + '\n',
+        )
+        with self.assertRaises(CommandError):
+            self.run_import(path)
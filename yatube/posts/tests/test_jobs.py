@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import jobs
+from posts.models import ImageJob, Post, User
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageJobTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='job.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def test_upload_enqueues_job(self):
+        post = self.create_post()
+        self.assertTrue(post.image_pending)
+        self.assertEqual(
+            list(post.image_jobs.values_list('kind', 'status')),
+            [(ImageJob.REENCODE, ImageJob.PENDING)],
+        )
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(post.image_jobs.count(), 1)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.id,))
+        )
+        self.assertContains(response, 'Картинка обрабатывается')
+
+    def test_jobs_chain_clears_pending(self):
+        post = self.create_post()
+        for job_id in jobs.claim(10):
+            self.assertEqual(jobs.run_job(job_id), ImageJob.DONE)
+        post.refresh_from_db()
+        self.assertTrue(post.image_pending)
+        for job_id in jobs.claim(10):
+            self.assertEqual(jobs.run_job(job_id), ImageJob.DONE)
+        post.refresh_from_db()
+        self.assertFalse(post.image_pending)
+        self.assertIsNotNone(default.kvstore.get(ImageFile(post.image)))
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_reencode_replaces_file_after_saving(self):
+        post = self.create_post()
+        old_name = post.image.name
+        jobs.run_job(jobs.claim(10)[0])
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertFalse(post.image.storage.exists(old_name))
+
+    def test_failing_job_retried_then_failed(self):
+        post = self.create_post()
+        post.image.storage.delete(post.image.name)
+        job = post.image_jobs.get()
+        for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+            ImageJob.objects.filter(pk=job.pk).update(
+                run_after=job.created
+            )
+            self.assertEqual(jobs.claim(10), [job.pk])
+            jobs.run_job(job.pk)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+        self.assertEqual(job.status, ImageJob.FAILED)
+        post.refresh_from_db()
+        self.assertFalse(post.image_pending)
+
+    def test_job_without_post_fails_quietly(self):
+        post = self.create_post()
+        job_id = post.image_jobs.get().pk
+        self.assertEqual(jobs.claim(10), [job_id])
+        Post.objects.filter(pk=post.pk)._raw_delete('default')
+        self.assertEqual(jobs.run_job(job_id), ImageJob.FAILED)
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.FAILED)
+        ImageJob.objects.all().delete()
+        self.assertEqual(jobs.run_job(job_id), ImageJob.FAILED)
+
+    def test_status_page_for_staff_only(self):
+        self.create_post()
+        url = reverse('posts:image_jobs')
+        client = Client()
+        client.force_login(self.user)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.staff)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['outstanding']), 1)
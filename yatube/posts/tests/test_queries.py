@@ -0,0 +1,127 @@
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import EstimatedCountPaginator
+
+POSTS_COUNT = 10
+
+# Сколько запросов к БД может сделать страница, заполненная целиком.
+# Сессия и пользователь авторизованного клиента входят в бюджет.
+QUERY_BUDGET = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:profile': 5,
+    'posts:post_detail': 5,
+    'posts:follow_index': 3,
+    'admin:posts_post_changelist': 8,
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        for index in range(POSTS_COUNT):
+            author = User.objects.create_user(username=f'author{index}')
+            post = Post.objects.create(
+                text=f'Тестовый пост {index}',
+                author=author,
+                group=cls.group,
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            Comment.objects.create(
+                post=post,
+                author=author,
+                text='Тестовый комментарий',
+            )
+        cls.post = post
+        for index in range(POSTS_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{index}'),
+                text='Тестовый комментарий',
+            )
+        for index in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'Пост автора {index}',
+                author=cls.post.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_views_fit_query_budget(self):
+        """Число запросов страницы не зависит от количества постов."""
+        pages = {
+            'posts:index': {},
+            'posts:group_list': {'slug': self.group.slug},
+            'posts:profile': {'username': self.post.author.username},
+            'posts:post_detail': {'post_id': self.post.id},
+            'posts:follow_index': {},
+        }
+        for view, kwargs in pages.items():
+            with self.subTest(view=view):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(
+                        reverse(view, kwargs=kwargs)
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries),
+                    QUERY_BUDGET[view],
+                    '\n'.join(query['sql'] for query in queries),
+                )
+
+    def test_admin_changelist_fits_query_budget(self):
+        """Строки списка постов в админке не делают своих запросов."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.authorized_client.force_login(admin)
+        view = 'admin:posts_post_changelist'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse(view))
+        self.assertContains(response, '<option value="{}" selected>'.format(
+            self.group.id
+        ))
+        self.assertLessEqual(
+            len(queries),
+            QUERY_BUDGET[view],
+            '\n'.join(query['sql'] for query in queries),
+        )
+
+    def test_estimated_count_paginator(self):
+        posts = Post.objects.order_by('-id')
+        paginator = EstimatedCountPaginator(posts, 10)
+        paginator.ESTIMATE_FROM = 0
+        self.assertEqual(paginator.count, posts.first().id)
+        filtered = EstimatedCountPaginator(posts.filter(group=None), 10)
+        filtered.ESTIMATE_FROM = 0
+        self.assertEqual(filtered.count, 0)
+
+    def test_estimated_count_clamped_on_last_page(self):
+        posts = Post.objects.order_by('-id')
+        for post in posts.reverse()[:5]:
+            post.delete()
+        paginator = EstimatedCountPaginator(posts, 10)
+        paginator.ESTIMATE_FROM = 0
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(len(paginator.page(2)), 5)
+        self.assertEqual(paginator.count, posts.count())
+        paginator = EstimatedCountPaginator(posts, 5)
+        paginator.ESTIMATE_FROM = 0
+        self.assertEqual(paginator.num_pages, 4)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+        self.assertEqual(paginator.num_pages, 3)
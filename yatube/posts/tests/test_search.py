@@ -0,0 +1,64 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Котики любят спать на солнце',
+        )
+
+    def found(self, text):
+        return list(search.search(text).values_list('id', flat=True))
+
+    def test_index_follows_writes(self):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(self.found('котик'), [post.id])
+        post.text = 'Собаки любят гулять'
+        post.save()
+        self.assertEqual(self.found('котик'), [])
+        self.assertEqual(self.found('собаки гулять'), [post.id])
+        bulk = Post.objects.bulk_create(
+            [Post(author=self.user, text='Собаки спят')]
+        )
+        self.assertEqual(len(self.found('собаки')), 1 + len(bulk))
+        post.delete()
+        self.assertEqual(len(self.found('собаки')), 1)
+
+    def test_operators_are_not_interpreted(self):
+        self.assertEqual(self.found('котики" (спать*'), [self.post.id])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_search_page_ranked_with_cursor(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост номер {i} про спать')
+            for i in range(12)
+        )
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'спать'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        ranks = [post.rank for post in page_obj]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertContains(response, 'q=%D1%81%D0%BF%D0%B0%D1%82%D1%8C&amp;')
+        response = self.client.get(
+            url, {'q': 'спать', 'cursor': page_obj.next_cursor}
+        )
+        second = response.context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(
+            {post.id for post in second} & {post.id for post in page_obj}
+        )
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'солнце'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,210 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts import archive, counters, export, importer, search
+from posts.models import (ArchivedComment, ArchivedPost, Comment, FeedEntry,
+                          Follow, Group, Post, PostSequence, User, UserStats)
+
+SHARDS = ['test_shard0', 'test_shard1']
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTests(TransactionTestCase):
+    def setUp(self):
+        for alias in SHARDS:
+            settings_dict = dict(connection.settings_dict)
+            settings_dict['NAME'] = (
+                f'file:{alias}_{id(self)}?mode=memory&cache=shared'
+            )
+            connections.databases[alias] = settings_dict
+            with connections[alias].schema_editor() as editor:
+                editor.create_model(Post)
+                editor.create_model(Comment)
+                editor.create_model(PostSequence)
+            search.install(connections[alias])
+            # Таблиц пользователей и групп на шарде нет.
+            connections[alias].cursor().execute('PRAGMA foreign_keys = OFF')
+        connection.cursor().execute('PRAGMA foreign_keys = OFF')
+        cache.clear()
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        self.reader = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(username=f'author{index}')
+            for index in range(2)
+        ]
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=author, group=self.group
+            )
+            for index in range(2)
+            for author in self.authors
+        ]
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        connection.cursor().execute('PRAGMA foreign_keys = ON')
+        for alias in SHARDS:
+            del connections[alias]
+            del connections.databases[alias]
+
+    def shard(self, author):
+        return SHARDS[author.id % len(SHARDS)]
+
+    def test_posts_live_on_author_shard(self):
+        self.assertFalse(Post.objects.using('default').exists())
+        for post in self.posts:
+            with self.subTest(post=post.id):
+                shard = self.shard(post.author)
+                self.assertEqual(SHARDS[post.id % len(SHARDS)], shard)
+                self.assertTrue(
+                    Post.objects.using(shard).filter(pk=post.pk).exists()
+                )
+        self.assertEqual(
+            set(self.authors[0].posts.values_list('id', flat=True)),
+            {post.id for post in self.posts if post.author == self.authors[0]},
+        )
+
+    def test_listings_merge_shards_by_date(self):
+        """Главная, группа и лента собирают посты со всех шардов."""
+        newest_first = [post.id for post in reversed(self.posts)]
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:follow_index'),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    [post.id for post in response.context['page_obj']],
+                    newest_first,
+                )
+
+    def test_comments_follow_their_post(self):
+        post = self.posts[-1]
+        self.client.post(
+            reverse('posts:add_comment', args=(post.id,)),
+            {'text': 'Комментарий'},
+        )
+        self.assertTrue(
+            Comment.objects.using(self.shard(post.author)).filter(
+                post_id=post.id
+            ).exists()
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.id,))
+        )
+        self.assertEqual(response.context['post'].comments_count, 1)
+        self.assertEqual(
+            [comment.text for comment in post.comments.all()],
+            ['Комментарий'],
+        )
+
+    def test_orm_create_puts_comment_on_post_shard(self):
+        post = self.posts[-1]
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Из ORM'
+        )
+        shard = self.shard(post.author)
+        self.assertEqual(comment._state.db, shard)
+        self.assertTrue(
+            Comment.objects.using(shard).filter(pk=comment.pk).exists()
+        )
+        self.assertFalse(Comment.objects.using('default').exists())
+
+    def test_archive_keeps_comments_from_all_shards(self):
+        """id комментариев на разных шардах совпадают, архив их не путает."""
+        for post in self.posts:
+            for index in range(2):
+                post.comments.create(author=self.reader, text=f'К {index}')
+        for post in self.posts:
+            Post.objects.shard_of(post.id).filter(pk=post.id).update(
+                pub_date=timezone.now() - timedelta(days=400)
+            )
+        list(archive.archive(archive.cutoff(365), 10))
+        self.assertEqual(ArchivedComment.objects.count(), 2 * len(self.posts))
+        for alias in SHARDS:
+            self.assertFalse(Comment.objects.using(alias).exists())
+
+    def test_new_posts_do_not_reuse_archived_ids(self):
+        newest = self.posts[-1]
+        Post.objects.shard_of(newest.id).filter(pk=newest.id).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        list(archive.archive(archive.cutoff(365), 10))
+        post = Post.objects.create(text='Новый пост', author=newest.author)
+        self.assertGreater(post.id, newest.id)
+        self.assertEqual(
+            ArchivedPost.objects.get(pk=newest.id).text, newest.text
+        )
+
+    def test_deleting_author_clears_shards(self):
+        author, other = self.authors
+        own_post = next(post for post in self.posts if post.author == author)
+        other_post = next(post for post in self.posts if post.author == other)
+        own_post.comments.create(author=other, text='Чужой комментарий')
+        other_post.comments.create(author=author, text='Комментарий автора')
+        author_id = author.id
+        author.delete()
+        for alias in SHARDS:
+            self.assertFalse(
+                Post.objects.using(alias).filter(author_id=author_id).exists()
+            )
+            self.assertFalse(
+                Comment.objects.using(alias).filter(
+                    post_id=own_post.id
+                ).exists()
+            )
+        self.assertFalse(other_post.comments.exists())
+        other_post.refresh_from_db()
+        self.assertEqual(other_post.comments_count, 0)
+        self.assertEqual(
+            self.client.get(reverse('posts:index')).status_code, 200
+        )
+
+    def test_reconcile_counts_posts_on_shards(self):
+        post = self.posts[-1]
+        post.comments.create(author=self.reader, text='Комментарий')
+        Post.objects.shard_of(post.id).filter(pk=post.id).update(
+            comments_count=5
+        )
+        self.assertEqual(counters.reconcile(), (0, 1))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        for author in self.authors:
+            self.assertEqual(
+                UserStats.objects.get(user=author).posts_count, 2
+            )
+
+    def test_deleting_post_clears_default_rows(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        post = Post.objects.create(text='Удаляемый', author=self.authors[0])
+        post.comments.create(author=self.reader, text='Комментарий')
+        post_id = post.id
+        self.assertTrue(FeedEntry.objects.filter(post_id=post_id).exists())
+        post.delete()
+        self.assertFalse(FeedEntry.objects.filter(post_id=post_id).exists())
+        self.assertFalse(
+            Comment.objects.shard_of(post_id).filter(post_id=post_id).exists()
+        )
+
+    def test_search_reads_every_shard(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'Пост'})
+        self.assertEqual(
+            {post.id for post in response.context['page_obj']},
+            {post.id for post in self.posts},
+        )
+
+    def test_export_and_import_refuse_shards(self):
+        with self.assertRaises(ImproperlyConfigured):
+            next(export.export_lines())
+        with self.assertRaises(ImproperlyConfigured):
+            importer.Importer()
@@ -5,9 +5,13 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Follow, Group, Post, User
+from posts.cache import bump
+from posts.models import Comment, Follow, Group, Post, User
+from posts.views import N_COMMENTS
 
 TEST_POST_ON_PAGE = 12
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -175,6 +179,62 @@ class TestView(TestCase):
                 )
                 self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_pages_keyset_paginator_context(self):
+        post_list = []
+        for index in range(TEST_POST_ON_PAGE):
+            post_list.append(
+                Post(
+                    text=f'Тестовый пост {index}',
+                    author=self.user,
+                    group=self.group,
+                )
+            )
+        Post.objects.bulk_create(post_list)
+        first_page = self.guest_client.get(reverse('posts:index'))
+        next_cursor = first_page.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            second_page = self.guest_client.get(
+                reverse('posts:index') + f'?cursor={next_cursor}'
+            )
+        page_obj = second_page.context['page_obj']
+        self.assertEqual(len(page_obj), 3)
+        self.assertEqual(page_obj.number, 2)
+        self.assertFalse(page_obj.has_next())
+        self.assertNotIn(
+            'COUNT', ' '.join(query['sql'] for query in queries)
+        )
+        self.assertFalse(
+            set(first_page.context['page_obj']) & set(page_obj)
+        )
+        response = self.guest_client.get(
+            reverse('posts:index') + f'?cursor={page_obj.previous_cursor}'
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first_page.context['page_obj']),
+        )
+
+    def test_post_detail_comments_paginated(self):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Коммент {i}')
+            for i in range(N_COMMENTS + 5)
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), N_COMMENTS)
+        self.assertEqual(comments[0].text, 'Коммент 0')
+        fragment = self.guest_client.get(
+            reverse('posts:comments', args=(self.post.id,)),
+            {'cursor': comments.next_cursor},
+        )
+        self.assertTemplateUsed(fragment, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(fragment, 'base.html')
+        self.assertEqual(len(fragment.context['comments']), 5)
+        self.assertContains(fragment, f'Коммент {N_COMMENTS + 4}')
+        self.assertNotContains(fragment, 'Показать ещё')
+
     def test_guest_add_comment(self):
         '''Добавление комментария неавторизированного пользователя'''
         response = self.guest_client.get(
@@ -184,24 +244,80 @@ class TestView(TestCase):
             response, f'/auth/login/?next=/posts/{self.post.id}/comment/'
         )
 
+    def test_conditional_get(self):
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        Post.objects.create(text='Свежий пост', author=self.user)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_conditional_get_post_detail_comments(self):
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.user, text='Ещё')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_new_login_gets_fresh_form(self):
+        """После нового входа старый ETag не отдаёт форму со старым CSRF."""
+        User.objects.create_user(username='returning', password='pass')
+        credentials = {'username': 'returning', 'password': 'pass'}
+        client = Client()
+        client.post(reverse('users:login'), credentials)
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        client.post(reverse('users:logout'))
+        client.post(reverse('users:login'), credentials)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
     def test_cache_index_page(self):
         new_post = Post.objects.create(
             text='New post',
             author=self.user
         )
-        actual_page = self.authorized_client.get(
-            reverse('posts:index')
-        ).content
+        actual_page = self.authorized_client.get(reverse('posts:index'))
+        cached_page = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNone(cached_page.context)
+        self.assertEqual(actual_page.content, cached_page.content)
         new_post.delete()
-        cached_page = self.authorized_client.get(
-            reverse('posts:index')
-        ).content
-        self.assertEqual(actual_page, cached_page)
-        cache.clear()
-        cleared_page = self.authorized_client.get(
-            reverse('posts:index')
-        ).content
-        self.assertNotEqual(actual_page, cleared_page)
+        refreshed_page = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNotNone(refreshed_page.context)
+        self.assertNotContains(refreshed_page, 'New post')
+
+    def test_page_cache_is_per_user(self):
+        reader = User.objects.create_user(username='cached_reader')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        Follow.objects.create(user=reader, author=self.user)
+        pages = (
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:group_list', args=(self.group.slug,)),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(reader_client.get(url), 'cached_reader')
+                response = self.guest_client.get(url)
+                self.assertIsNotNone(response.context)
+                self.assertNotContains(response, 'cached_reader')
+                self.assertNotContains(response, 'Отписаться')
 
     def test_follow(self):
         user = User.objects.create_user(username='username')
@@ -273,3 +389,44 @@ class TestView(TestCase):
         )
         new_count = len(response.context['page_obj'])
         self.assertEqual(actual_count, new_count)
+
+    def test_follow_feed_backfill_and_prune(self):
+        user = User.objects.create_user(username='username')
+        other = User.objects.create_user(username='other')
+        authorized_client = Client()
+        authorized_client.force_login(user)
+        Follow.objects.create(user=other, author=self.user)
+        authorized_client.get(
+            reverse('posts:profile_follow', args=(self.user.username,))
+        )
+        response = authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(self.post, response.context['page_obj'])
+        authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.user.username,))
+        )
+        response = authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertTrue(
+            Follow.objects.filter(user=other, author=self.user).exists()
+        )
+        self.assertTrue(other.feed.filter(post=self.post).exists())
+
+    def test_article_fragment_cache(self):
+        url = reverse('posts:profile', kwargs={'username': 'tester'})
+        self.guest_client.get(url)
+        # Страница рендерится заново, а статьи берутся из кэша фрагментов.
+        bump('page:profile:tester')
+        response = self.guest_client.get(url)
+        self.assertTemplateUsed(response, 'posts/profile.html')
+        self.assertTemplateNotUsed(response, 'posts/includes/article.html')
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            data={'text': 'Изменённый текст', 'group': self.group.id},
+        )
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Изменённый текст')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, '/group/new-slug/')
@@ -0,0 +1,15 @@
+"""Миниатюры картинок постов, подготовленные заранее.
+
+Шаблоны вызывают {% thumbnail %} с теми же размерами и опциями, что и
+settings.POST_THUMBNAILS, поэтому при отрисовке sorl находит готовый
+файл по ключу и не декодирует исходник. Генерацию выполняет фоновая
+задача из posts.jobs.
+"""
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+
+def generate(post):
+    """Создаёт все настроенные миниатюры картинки поста."""
+    for geometry, options in settings.POST_THUMBNAILS:
+        get_thumbnail(post.image, geometry, **options)
@@ -1,7 +1,238 @@
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+from posts import sharding
 
+CURSOR_SALT = 'posts.utils.cursor'
 
-def paginator(request, post_list, k_post):
-    paginator = Paginator(post_list, k_post)
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который не считает строки большой таблицы целиком.
+
+    Для нефильтрованного списка число строк оценивается по
+    максимальному первичному ключу - это один шаг по индексу.
+    Оценка используется, только если она больше ESTIMATE_FROM,
+    маленькие таблицы и отфильтрованные списки считаются точно.
+    После удалений и архивации оценка завышена, поэтому страница, на
+    которой строки кончились, заменяет её точным числом.
+    """
+    ESTIMATE_FROM = 10000
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = queryset.model._default_manager.aggregate(
+                last=Max('pk')
+            )['last'] or 0
+            if estimate > self.ESTIMATE_FROM:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        page = super().page(number)
+        rows = len(page.object_list)
+        if not self.estimated or rows == self.per_page:
+            return page
+        self.estimated = False
+        self.__dict__.pop('num_pages', None)
+        if rows:
+            self.count = (page.number - 1) * self.per_page + rows
+            return page
+        # Пустая страница за концом списка: номер проверяется заново.
+        self.count = self.object_list.count()
+        return super().page(number)
+
+
+class KeysetPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки (по умолчанию pub_date, id).
+
+    Вместо номера страницы принимает непрозрачный курсор с последним
+    показанным ключом, поэтому не делает ни COUNT(*), ни OFFSET:
+    любая страница стоит столько же, сколько первая.
+    archive - продолжение списка в архиве: все его строки старше строк
+    object_list, поэтому к нему обращаются, только когда их не хватило.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 archive=None):
+        self.ordering = tuple(ordering)
+        self.archive = archive
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.num_pages = 1
+
+    def get_page(self, cursor):
+        """Возвращает страницу по курсору, битый курсор - первая страница."""
+        position = None
+        if cursor:
+            try:
+                position = signing.loads(cursor, salt=CURSOR_SALT)
+            except signing.BadSignature:
+                pass
+        return self.page(position)
+
+    def page(self, position=None):
+        number, backwards, seek = 1, False, Q()
+        if position is not None:
+            number, backwards = position['n'], position['b']
+            seek = self._seek(self._decode(position['k']), backwards)
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(self._flip(name) for name in ordering)
+        rows = self._fetch(seek, ordering, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        has_next = has_more
+        if backwards:
+            rows.reverse()
+            has_next = True
+            if not has_more:
+                number = 1
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = self._cursor(rows[-1], number + 1, False)
+        if rows and number > 1:
+            page.previous_cursor = self._cursor(rows[0], number - 1, True)
+        return page
+
+    def _fetch(self, seek, ordering, limit):
+        sources = [self.object_list]
+        if self.archive is not None:
+            sources.append(self.archive)
+        if not ordering[0].startswith('-'):
+            sources.reverse()
+        rows = []
+        for source in sources:
+            rows.extend(
+                self._rows(source.filter(seek), ordering, limit - len(rows))
+            )
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def _rows(self, queryset, ordering, limit):
+        return list(queryset.order_by(*ordering)[:limit])
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    def _seek(self, values, backwards):
+        """Условие «строго после ключа» в направлении обхода.
+
+        Первое поле дополнительно ограничено нестрогим неравенством,
+        чтобы SQLite мог пройти индекс диапазоном, а не перебором.
+        """
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        bound = Q(**{f'{self.fields[0]}__{lookup}e': values[0]})
+        after = Q()
+        for index, name in enumerate(self.fields):
+            exact = dict(zip(self.fields[:index], values[:index]))
+            exact[f'{name}__{lookup}'] = values[index]
+            after |= Q(**exact)
+        return bound & after
+
+    def _field(self, name):
+        """Поле модели или None для аннотации (например, rank поиска)."""
+        try:
+            return self.object_list.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _cursor(self, obj, number, backwards):
+        values = []
+        for name in self.fields:
+            field = self._field(name)
+            values.append(
+                field.value_to_string(obj) if field else getattr(obj, name)
+            )
+        return signing.dumps(
+            {'k': values, 'n': number, 'b': backwards}, salt=CURSOR_SALT
+        )
+
+    def _decode(self, values):
+        decoded = []
+        for name, value in zip(self.fields, values):
+            field = self._field(name)
+            decoded.append(field.to_python(value) if field else value)
+        return decoded
+
+
+class ScatterKeysetPaginator(KeysetPaginator):
+    """KeysetPaginator по всем шардам постов.
+
+    С каждого шарда берётся страница после курсора, страницы
+    сливаются по ключу сортировки, лишнее отбрасывается.
+    """
+
+    def _rows(self, queryset, ordering, limit):
+        if queryset.model._meta.label not in sharding.SHARDED:
+            return super()._rows(queryset, ordering, limit)
+        return sharding.scatter(
+            queryset, ordering, limit,
+            key=lambda obj: tuple(getattr(obj, name) for name in self.fields),
+        )
+
+
+class ChainedList:
+    """Два запроса подряд как один список для Paginator.
+
+    Строки second идут после строк first, поэтому срез сначала
+    читает first и обращается к second, только если их не хватило.
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    @cached_property
+    def head(self):
+        return self.first.count()
+
+    def count(self):
+        return self.head + self.second.count()
+
+    def __getitem__(self, key):
+        start, stop = key.start or 0, key.stop
+        rows = list(self.first[start:stop]) if start < self.head else []
+        if stop > self.head:
+            rows.extend(
+                self.second[max(start - self.head, 0):stop - self.head]
+            )
+        return rows
+
+
+def paginator(request, post_list, k_post, ordering=('-pub_date', '-id'),
+              scatter=False, archive=None):
+    """Страница списка постов.
+
+    Старые ссылки вида ?page=N обслуживает обычный Paginator,
+    всё остальное листается курсором ?cursor=... без подсчёта строк.
+    scatter - список по всем шардам, номера страниц там не работают.
+    Курсор после последнего поста продолжает список в archive,
+    номера страниц считаются по обеим таблицам сразу.
+    """
+    if scatter and sharding.enabled():
+        paginator = ScatterKeysetPaginator(
+            post_list, k_post, ordering, archive
+        )
+        return paginator.get_page(request.GET.get('cursor'))
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        post_list = post_list.order_by(*ordering)
+        if archive is not None:
+            post_list = ChainedList(post_list, archive.order_by(*ordering))
+        paginator = Paginator(post_list, k_post)
+        return paginator.get_page(page_number)
+    paginator = KeysetPaginator(post_list, k_post, ordering, archive)
+    return paginator.get_page(request.GET.get('cursor'))
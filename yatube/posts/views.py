@@ -1,29 +1,83 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.core import signing
+from django.db import transaction
+from django.db.models import Count, F
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
+from posts import export, search, sharding
+from posts.cache import cache_page_versioned, page_validators
 from posts.forms import CommentForm, PostForm
-from posts.models import Comment, Follow, Group, Post, User
-from posts.utils import paginator
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                          Group, ImageJob, Post, User)
+from posts.utils import KeysetPaginator, ScatterKeysetPaginator, paginator
 
 N_POST = 10
-CACHE_TIME = 20
+N_COMMENTS = 20
+CACHE_TIME = 60 * 60
 
 
-@cache_page(CACHE_TIME)
+def index_scopes(request):
+    return ['page:index']
+
+
+def group_scopes(request, slug):
+    return [f'page:group:{slug}', 'page:names']
+
+
+def profile_scopes(request, username):
+    return [f'page:profile:{username}', 'page:names']
+
+
+def post_scopes(request, post_id):
+    posts = Post.objects.shard_of(post_id).filter(pk=post_id)
+    if sharding.enabled():
+        username = User.objects.filter(
+            pk=posts.values_list('author_id', flat=True).first()
+        ).values_list('username', flat=True).first()
+    else:
+        username = posts.values_list('author__username', flat=True).first()
+    if username is None:
+        username = ArchivedPost.objects.filter(pk=post_id).values_list(
+            'author__username', flat=True
+        ).first()
+    return [
+        f'post:{post_id}',
+        f'comments:{post_id}',
+        f'page:profile:{username}',
+        'page:names',
+    ]
+
+
+def follow_scopes(request):
+    return ['page:index', 'page:names', f'feed:{request.user.pk}']
+
+
+@page_validators(index_scopes)
+@cache_page_versioned(CACHE_TIME, index_scopes)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    page_obj = paginator(request, post_list, N_POST)
+    post_list = Post.objects.for_listing()
+    page_obj = paginator(
+        request, post_list, N_POST, scatter=True,
+        archive=ArchivedPost.objects.for_listing(),
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@page_validators(group_scopes)
+@cache_page_versioned(CACHE_TIME, group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group)
-    page_obj = paginator(request, post_list, N_POST)
+    post_list = group.posts.for_listing()
+    page_obj = paginator(
+        request, post_list, N_POST, scatter=True,
+        archive=group.archived_posts.for_listing(),
+    )
     template = 'posts/group_list.html'
     context = {
         'group': group,
@@ -32,14 +86,21 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@page_validators(profile_scopes)
+@cache_page_versioned(CACHE_TIME, profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     following = False
     if request.user.is_authenticated:
-        if request.user.follower.filter(author=author):
+        if request.user.follower.filter(author=author).exists():
             following = True
-    post_list = author.posts.all()
-    page_obj = paginator(request, post_list, N_POST)
+    post_list = author.posts.for_listing()
+    page_obj = paginator(
+        request, post_list, N_POST,
+        archive=author.archived_posts.for_listing(),
+    )
     template = 'posts/profile.html'
     context = {
         'author': author,
@@ -49,22 +110,70 @@ def profile(request, username):
     return render(request, template, context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search.search(query, Post.objects.for_listing())
+    keyset_class = (
+        ScatterKeysetPaginator if sharding.enabled() else KeysetPaginator
+    )
+    keyset = keyset_class(posts, N_POST, ordering=('rank', 'id'))
+    page_obj = keyset.get_page(request.GET.get('cursor'))
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@page_validators(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = Comment.objects.filter(post=post)
+    post = Post.objects.shard_of(post_id).for_listing().with_related(
+        'author__stats'
+    ).filter(id=post_id).first()
+    if post is None:
+        post = get_object_or_404(
+            ArchivedPost.objects.for_listing().select_related('author__stats'),
+            id=post_id,
+        )
     form = CommentForm(
         request.POST or None,
     )
     template = 'posts/post_detail.html'
     context = {
         'post': post,
+        'post_id': post.id,
         'form': form,
-        'comments': comments,
+        'comments': comments_page(request, post.id, post.archived),
     }
     return render(request, template, context)
 
 
+def comments_page(request, post_id, archived=False):
+    if archived:
+        comments = ArchivedComment.objects.for_listing()
+    else:
+        comments = Comment.objects.shard_of(post_id).for_listing()
+    comments = comments.filter(post_id=post_id)
+    keyset = KeysetPaginator(
+        comments, N_COMMENTS, ordering=('created', 'id')
+    )
+    return keyset.get_page(request.GET.get('cursor'))
+
+
+def post_comments(request, post_id):
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(
+            request, post_id,
+            not Post.objects.shard_of(post_id).filter(pk=post_id).exists(),
+        ),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -86,7 +195,7 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.shard_of(post_id), id=post_id)
     form = PostForm(
         request.POST or None,
         instance=post,
@@ -109,8 +218,9 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.shard_of(post_id), id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -121,10 +231,30 @@ def add_comment(request, post_id):
 
 
 @login_required
+@page_validators(follow_scopes)
 def follow_index(request):
-    follower = Follow.objects.filter(user=request.user).values('author')
-    post_list = Post.objects.filter(author__in=follower)
-    page_obj = paginator(request, post_list, N_POST)
+    feed = request.user.feed.all()
+    if not sharding.enabled():
+        feed = feed.select_related('post__author', 'post__group')
+    # Записи ленты архивных постов удалены, их дочитываем по подпискам.
+    archive = ArchivedPost.objects.filter(
+        author__following__user=request.user
+    ).for_listing().annotate(post_id=F('id'))
+    page_obj = paginator(
+        request, feed, N_POST, ordering=('-pub_date', '-post_id'),
+        archive=archive,
+    )
+    rows = page_obj.object_list
+    archived = [row for row in rows if isinstance(row, ArchivedPost)]
+    entries = [row for row in rows if not isinstance(row, ArchivedPost)]
+    if sharding.enabled():
+        posts = sharding.gather(
+            Post.objects.for_listing(),
+            [entry.post_id for entry in entries],
+        )
+    else:
+        posts = [entry.post for entry in entries]
+    page_obj.object_list = posts + archived
     context = {
         'page_obj': page_obj,
     }
@@ -132,6 +262,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     if request.user.username != username:
         Follow.objects.get_or_create(
@@ -142,8 +273,40 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
-    author = User.objects.get(username=username)
-    if Follow.objects.filter(author=author).exists():
-        Follow.objects.filter(author=author).delete()
+    Follow.objects.filter(
+        user=request.user,
+        author__username=username,
+    ).delete()
     return redirect('posts:profile', username=username)
+
+
+@staff_member_required
+def image_jobs(request):
+    counts = ImageJob.objects.values('kind', 'status').annotate(
+        total=Count('id')
+    ).order_by('kind', 'status')
+    outstanding = ImageJob.objects.exclude(
+        status=ImageJob.DONE
+    ).select_related('post').order_by('-id')[:N_POST * 5]
+    context = {
+        'counts': counts,
+        'outstanding': outstanding,
+    }
+    return render(request, 'posts/image_jobs.html', context)
+
+
+@staff_member_required
+def export_ndjson(request):
+    sharding.require_unsharded('Выгрузка')
+    since = request.GET.get('since', '')
+    try:
+        export.parse_cursor(since)
+    except signing.BadSignature:
+        return HttpResponseBadRequest('Неверный курсор since.')
+    response = StreamingHttpResponse(
+        export.export_lines(since), content_type='application/x-ndjson'
+    )
+    response['Content-Disposition'] = 'attachment; filename="posts.ndjson"'
+    return response
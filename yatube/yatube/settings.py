@@ -1,11 +1,16 @@
 import os
+import sys
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Запуск тестов: manage.py test или pytest.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 SECRET_KEY = os.getenv('SECRET_KEY', default="SUP3R-S3CR3T-K3Y-F0R-MY-PR0J3CT")
 
 DEBUG = False
@@ -33,11 +38,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.slowlog.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -46,6 +54,9 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# При DEBUG = False Django сам оборачивает загрузчики в cached.Loader:
+# разобранные шаблоны живут в памяти процесса, а при старте их заранее
+# компилирует core.warmup.warm_templates() из wsgi.py.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -65,13 +76,107 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Профили соединения с SQLite, выбираются переменной DB_PROFILE.
+# production: WAL (читатели не ждут писателей), ожидание блокировки
+# вместо "database is locked", BEGIN IMMEDIATE в atomic() и соединения,
+# которые живут между запросами. plain - настройки Django по умолчанию.
+DATABASE_PROFILES = {
+    'plain': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+    },
+    'production': {
+        'ENGINE': 'core.db.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'busy_timeout': 20000,
+                'synchronous': 'NORMAL',
+                'cache_size': -64000,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
+    },
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **DATABASE_PROFILES[os.getenv('DB_PROFILE', 'production')],
     }
 }
 
+# Реплики для чтения страниц ленты (core.replicas), их число задаёт
+# DB_REPLICAS. Копии обновляет команда sync_replicas; реплика, которая
+# отстала больше REPLICA_MAX_LAG секунд, не используется. После записи
+# клиент REPLICA_PIN_SECONDS читает из основной базы.
+REPLICA_DATABASES = [
+    f'replica{index}' for index in range(1, int(os.getenv('DB_REPLICAS', 0)) + 1)
+]
+REPLICA_PRAGMAS = {
+    name: value
+    for name, value in DATABASES['default']['OPTIONS'].get(
+        'pragmas', {}
+    ).items()
+    if name != 'journal_mode'
+}
+for alias in REPLICA_DATABASES:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'OPTIONS': (
+            {'pragmas': {**REPLICA_PRAGMAS, 'query_only': 'ON'}}
+            if DATABASES['default']['ENGINE'] == 'core.db.sqlite3' else {}
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Шарды постов и комментариев (posts.sharding), их число задаёт DB_SHARDS.
+# Связи между базами проверяет приложение, поэтому внешние ключи SQLite
+# при шардировании выключены; нужен профиль production.
+POST_SHARDS = [
+    f'shard{index}' for index in range(int(os.getenv('DB_SHARDS', 0)))
+]
+if POST_SHARDS:
+    if DATABASES['default']['ENGINE'] != 'core.db.sqlite3':
+        raise ImproperlyConfigured(
+            'DB_SHARDS работает только с DB_PROFILE=production: '
+            'внешние ключи выключает движок core.db.sqlite3.'
+        )
+    DATABASES['default']['OPTIONS'] = {
+        **DATABASES['default']['OPTIONS'],
+        'pragmas': {
+            **DATABASES['default']['OPTIONS'].get('pragmas', {}),
+            'foreign_keys': 'OFF',
+        },
+    }
+for alias in POST_SHARDS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+    }
+
+DATABASE_ROUTERS = ['posts.sharding.ShardRouter', 'core.replicas.ReplicaRouter']
+REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+]
+REPLICA_SYNC_INTERVAL = float(os.getenv('REPLICA_SYNC_INTERVAL', 5))
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 30))
+REPLICA_PIN_SECONDS = int(REPLICA_MAX_LAG + REPLICA_SYNC_INTERVAL)
+
+# Посты старше POST_ARCHIVE_AFTER_DAYS дней команда archive_posts
+# переносит в архивные таблицы порциями по POST_ARCHIVE_BATCH.
+POST_ARCHIVE_AFTER_DAYS = int(os.getenv('POST_ARCHIVE_AFTER_DAYS', 365))
+POST_ARCHIVE_BATCH = int(os.getenv('POST_ARCHIVE_BATCH', 500))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -110,14 +215,80 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры, которые воркер image_worker готовит после загрузки картинки.
+# Размеры и опции должны совпадать с {% thumbnail %} в шаблонах.
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Загруженные картинки уменьшаются фоновым воркером до этого размера.
+POST_IMAGE_MAX_SIZE = (1920, 1920)
+
+# Общий для всех процессов кэш в файле SQLite (core.cache.sqlite).
+# Для кэша в памяти процесса: CACHE_BACKEND=django.core.cache.backends.locmem.LocMemCache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'core.cache.sqlite.SQLiteCache'),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
     }
 }
+if TESTING:
+    # cache.clear() в тестах не должен стирать кэш разработки, а
+    # параллельные прогоны - делить общий файл.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# /metrics отдаётся персоналу и запросам с заголовком
+# Authorization: Bearer <METRICS_TOKEN>; пустой токен - только персоналу.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Запросы к БД дольше стольких миллисекунд пишутся в журнал
+# медленных запросов (core.slowlog). Пустое значение выключает журнал.
+SLOW_QUERY_MS = os.getenv('SLOW_QUERY_MS', '100')
+SLOW_QUERY_MS = float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'slow_queries.log')
+)
+# Параметры запросов попадают в журнал только по явному SLOW_QUERY_LOG_PARAMS=1:
+# среди них данные сессий и хеши паролей.
+SLOW_QUERY_LOG_PARAMS = os.getenv('SLOW_QUERY_LOG_PARAMS', '') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.slowlog.JSONFormatter'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'core.slowlog': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Импорт после get_wsgi_application(): к этому моменту django.setup()
+# уже выполнен и движок шаблонов настроен.
+from core.warmup import warm_templates  # noqa: E402
+
+warm_templates()